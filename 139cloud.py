@@ -6,6 +6,11 @@
 # 环境变量设置:
 #   - 名称：[ydypCK]   格式：[Authorization值#手机号#token值]
 #   - 多账号处理方式：[换行或者@分割]
+#   - 名称：[YDYP_WORKERS]  并发执行的账号数，默认1（逐个执行）
+#   - 名称：[YDYP_TASK_WORKERS]  单个账号内同时执行的任务数，默认4，设为1按顺序执行
+#   - 名称：[YDYP_HOST_LIMIT]  同一域名同时进行的最大请求数，默认8
+#   - 名称：[YDYP_POOL_SIZE]  每个域名保持的连接数，默认16，所有账号共享
+#   - 名称：[YDYP_ACCOUNT_RATE] [YDYP_HOST_RATE]  每个账号/每个域名每秒请求数，默认1.5/20，见rate_limiter.py
 # 定时设置: [0 0 8,16,20 * * *]
 # 更新日志:
 #   - [1.30]: [同一环境变量获取]
@@ -15,39 +20,41 @@
 # fix 20240828 ArcadiaScriptPublic  频道：https://t.me/ArcadiaScript 群组：https://t.me/ArcadiaScriptPublic
 # 抓包 第一个参数小程序orches.yun.139.com 或者aas.caiyun.feixin.10086.cn 搜Basic 全局搜也行  第三个参数app 域名caiyun.feixin.10086.cn或者签到链接https://caiyun.feixin.10086.cn:7071/market/signin/task/click?key=task&id=409的jwttoken
 # 原仓库：https://github.com/zjk2017/ArcadiaScriptPublic
+import contextvars
+import copy
 import os
 import random
 import re
+import sys
+import threading
 import time
-from os import path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 
+import circuit_breaker
+import http_pool
+import metrics
+import rate_limiter
+import tracing
+from account_result import INVALID, AccountResult, ResultCollector
+from circuit_breaker import CircuitOpenError
+from fn_print import capture, emit
+from lazy_import import profile_startup
+from notifier import Notifier
+from rate_limiter import account_limiter, burst_limiter
+from retry_policy import default_policy
+from task_graph import TaskGraph
+from token_cache import token_cache
+from xml_templates import APP_UPLOAD_REQUEST
+
 ua = 'Mozilla/5.0 (Linux; Android 11; M2012K10C Build/RP1A.200720.011; wv) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/90.0.4430.210 Mobile Safari/537.36 MCloudApp/10.0.1'
 
 # 环境变量：多账号token若以换行分割，pycharm里编辑配置环境变量不能读取所有账号，只能读取一个（最好“@”分割）
-err_accounts = ''  # 异常账号
-err_message = ''  # 错误信息
-user_amount = ''  # 用户云朵·数量
 GLOBAL_DEBUG = False
 
-
-# 发送通知
-def load_send():
-    cur_path = path.abspath(path.dirname(__file__))
-    notify_file = cur_path + "/notify.py"
-
-    if path.exists(notify_file):
-        try:
-            from notify import send  # 导入模块的send为notify_send
-            print("加载通知服务成功！")
-            return send  # 返回导入的函数
-        except ImportError:
-            print("加载通知服务失败~")
-    else:
-        print("加载通知服务失败~")
-
-    return False  # 返回False表示未成功加载通知服务
+WORKERS = max(1, int(os.getenv('YDYP_WORKERS') or 1))  # 并发账号数
+TASK_WORKERS = max(1, int(os.getenv('YDYP_TASK_WORKERS') or 4))  # 单个账号内并发执行的任务数
 
 
 class YP:
@@ -57,7 +64,12 @@ class YP:
         self.note_auth = None
         self.click_num = 15  # 定义抽奖次数和摇一摇戳一戳次数
         self.draw = 1  # 抽奖次数，首次免费
-        self.session = requests.Session()
+        self.session = http_pool.new_session()
+        self.retry_policy = default_policy
+        self.retry_budget = default_policy.new_budget()  # 本账号剩余重试次数
+        self.jwt_lock = threading.Lock()  # 并发的任务同时遇到401时只重新登录一次
+        self.limiter = account_limiter()  # 本账号的请求节奏
+        self.burst_limiter = burst_limiter()  # 戳一戳、摇一摇批量请求的节奏
 
         self.timestamp = str(int(round(time.time() * 1000)))
         self.cookies = {'sensors_stay_time': self.timestamp}
@@ -65,6 +77,7 @@ class YP:
         self.account = cookie.split("#")[1]
         self.auth_token = cookie.split("#")[2]
         self.encrypt_account = self.account[:3] + "*" * 4 + self.account[7:]
+        self.result = AccountResult(self.encrypt_account)
         self.fruit_url = 'https://happy.mail.10086.cn/jsp/cn/garden/'
 
         self.jwtHeaders = {
@@ -87,78 +100,108 @@ class YP:
             try:
                 return func(self, *args, **kwargs)
             except Exception as e:
-                global err_message
                 print("错误:", str(e))
-                err_message += f'用户[{self.encrypt_account}]:{e}\n'  # 错误信息
+                self.result.errors.append(str(e))
             return None
 
         return wrapper
 
-    @catch_errors
     def run(self):
+        """
+        执行所有任务
+        :return: AccountResult
+        """
+        self.result.start()
+        try:
+            with metrics.labels(account=self.encrypt_account), tracing.track(self.encrypt_account):
+                self._run()
+        finally:
+            self.result.finish()
+        return self.result
+
+    @catch_errors
+    def _run(self):
         if self.jwt():
-            self.signin_status()
-            self.click()
-            # 任务
-            self.get_tasklist(url='sign_in_3', app_type='cloud_app')
+            # 任务只依赖jwtToken的可以并发执行，领取云朵要等所有产生奖励的任务完成
+            graph = TaskGraph(max_workers=TASK_WORKERS)
+            graph.add('signin_status', self.signin_status)
+            graph.add('click', self.click)
+            # 任务（做笔记任务内部先刷新笔记token再创建笔记，按顺序执行）
+            graph.add('get_tasklist', lambda: self.get_tasklist(url='sign_in_3', app_type='cloud_app'))
             # todo 都失效了
-            # print(f'\n☁️ 云朵大作战')
-            # self.cloud_game()
-            # print(f'\n🌳 果园任务')
-            # self.fruitLogin()
-            print(f'\n📰 公众号任务')
-            self.wxsign()
-            self.shake()
-            self.surplus_num()
-            print(f'\n🔥 热门任务')
-            self.backup_cloud()
-            self.open_send()
-            # print(f'\n📧 139邮箱任务')
-            # self.get_tasklist(url='newsign_139mail', app_type='email_app')
+            # graph.add('cloud_game', self.cloud_game, title=f'\n☁️ 云朵大作战')
+            # graph.add('fruitLogin', self.fruitLogin, title=f'\n🌳 果园任务')
+            graph.add('wxsign', self.wxsign, title=f'\n📰 公众号任务')
+            graph.add('shake', self.shake)
+            # 公众号签到可能增加抽奖次数
+            graph.add('surplus_num', self.surplus_num, deps=('wxsign',))
+            graph.add('backup_cloud', self.backup_cloud, title=f'\n🔥 热门任务')
+            graph.add('open_send', self.open_send)
+            # graph.add('email_tasklist', lambda: self.get_tasklist(url='newsign_139mail', app_type='email_app'),
+            #           title=f'\n📧 139邮箱任务')
             # 领取云朵
-            self.receive()
+            graph.add('receive', self.receive, deps=('signin_status', 'click', 'get_tasklist', 'wxsign', 'shake',
+                                                     'surplus_num', 'backup_cloud', 'open_send'))
+            graph.run()
+            graph.report()
+            self.result.timings = {task.name: task.duration for task in graph.tasks.values()}
         else:
-            global err_accounts
             # 失效账号
-            err_accounts += f'{self.encrypt_account}\n'
+            self.result.status = INVALID
 
     @catch_errors
     def send_request(self, url, headers=None, cookies=None, data=None, params=None, method='GET', debug=None,
-                     retries=5):
+                     retries=None, limiter=None):
 
         debug = debug if debug is not None else GLOBAL_DEBUG
 
-        self.session.headers.update(headers or {})
-        if cookies:
-            self.session.cookies.update(cookies)
+        # 请求头和cookie只作用于本次请求，不修改session，可在多个线程中同时调用
         request_args = {'json': data} if isinstance(data, dict) else {'data': data}
 
-        for attempt in range(retries):
+        policy = self.retry_policy
+        if retries is not None and retries != policy.max_attempts:
+            policy = copy.copy(policy)
+            policy.max_attempts = retries
+
+        attempt = 0
+        jwt_refreshed = False
+        while True:
+            status = retry_after = None
+            sent_jwt = headers.get('jwtToken') if headers is self.jwtHeaders else None
+            (limiter or self.limiter).acquire()
             try:
-                response = self.session.request(method, url, params=params, **request_args)
+                response = self.session.request(method, url, params=params, headers=headers, cookies=cookies,
+                                                **request_args)
                 response.raise_for_status()
                 if debug:
                     print(f'\n【{url}】响应数据:\n{response.text}')
                 return response
+            except CircuitOpenError as e:
+                print(f"请求异常: {e}")
+                return None
             except (requests.RequestException, ConnectionError, TimeoutError) as e:
                 print(f"请求异常: {e}")
-                if attempt >= retries - 1:
-                    print("达到最大重试次数。")
-                    return None
-                time.sleep(1)
+                if getattr(e, 'response', None) is not None:
+                    status = e.response.status_code
+                    retry_after = e.response.headers.get('Retry-After')
+
+            # jwtToken过期（如使用了失效的缓存），重新登录后再试一次
+            if status == 401 and sent_jwt is not None and not jwt_refreshed:
+                jwt_refreshed = True
+                if self.refresh_jwt(sent_jwt):
+                    continue
 
-    # 随机延迟默认1-1.5s
-    def sleep(self, min_delay=1, max_delay=1.5):
-        delay = random.uniform(min_delay, max_delay)
-        time.sleep(delay)
+            delay = policy.next_delay(attempt, self.retry_budget, status, retry_after)
+            if delay is None:
+                print("达到最大重试次数或重试预算已用完。" if policy.is_retryable(status) else f"状态码{status}不可重试。")
+                return None
+            metrics.record_retry(method, url)
+            tracing.sleep(delay, 'retry')
+            attempt += 1
 
     # 日志
-    def log_info(self, err_msg=None, amount=None):
-        global err_message, user_amount
-        if err_msg is not None:
-            err_message += f'用户[{self.encrypt_account}]:{err_msg}\n'  # 错误信息
-        elif amount is not None:
-            user_amount += f'用户[{self.encrypt_account}]:{amount}\n'  # 云朵数量
+    def log_info(self, err_msg):
+        self.result.errors.append(err_msg)  # 错误信息
 
     # 刷新令牌
     def sso(self):
@@ -181,27 +224,56 @@ class YP:
             return None
 
     # jwt
-    def jwt(self):
+    @tracing.traced
+    def jwt(self, refresh=False):
+        # 优先使用本地缓存的jwtToken，过期或refresh时重新获取
+        cached_token = None if refresh else token_cache.get(self.account)
+        if cached_token is not None:
+            print('-使用缓存的jwtToken')
+            self.set_jwt(cached_token)
+            return True
+        if refresh:
+            token_cache.invalidate(self.account)
+
         # 获取jwttoken
         token = self.sso()
         if token is not None:
 
             jwt_url = f"https://caiyun.feixin.10086.cn:7071/portal/auth/tyrzLogin.action?ssoToken={token}"
-            jwt_data = self.send_request(jwt_url, headers=self.jwtHeaders, method='POST').json()
+            # 登录请求不带旧的jwtToken；jwtHeaders保持不变，其他任务在登录完成前仍使用旧token
+            login_headers = {key: value for key, value in self.jwtHeaders.items() if key != 'jwtToken'}
+            jwt_data = self.send_request(jwt_url, headers=login_headers, method='POST').json()
             if jwt_data['code'] != 0:
                 print(jwt_data['msg'])
                 return False
-            self.jwtHeaders['jwtToken'] = jwt_data['result']['token']
-            self.cookies['jwtToken'] = jwt_data['result']['token']
+            self.set_jwt(jwt_data['result']['token'])
+            token_cache.set(self.account, jwt_data['result']['token'])
             return True
         else:
             print('-ck可能失效了')
             return False
 
+    def refresh_jwt(self, stale_token):
+        """
+        请求返回401后刷新jwtToken；多个任务同时失效时只有第一个重新登录，其余等待后直接使用新token
+        :param stale_token: 收到401的请求使用的jwtToken
+        :return: 是否可以用新token重试
+        """
+        with self.jwt_lock:
+            if self.jwtHeaders.get('jwtToken') != stale_token:
+                return True
+            print('-jwtToken已失效，重新获取')
+            return self.jwt(refresh=True)
+
+    def set_jwt(self, jwt_token):
+        self.jwtHeaders['jwtToken'] = jwt_token
+        self.cookies['jwtToken'] = jwt_token
+        # 未显式传cookie的营销接口也需要带上jwtToken
+        self.session.cookies.set('jwtToken', jwt_token, domain='caiyun.feixin.10086.cn')
+
     # 签到查询
     @catch_errors
     def signin_status(self):
-        self.sleep()
         check_url = 'https://caiyun.feixin.10086.cn/market/signin/page/info?client=app'
         check_data = self.send_request(check_url, headers=self.jwtHeaders, cookies=self.cookies).json()
         if check_data['msg'] == 'success':
@@ -229,22 +301,37 @@ class YP:
         url = "https://caiyun.feixin.10086.cn/market/signin/task/click?key=task&id=319"
         successful_click = 0  # 获得次数
 
-        try:
-            for _ in range(self.click_num):
-                return_data = self.send_request(url, headers=self.jwtHeaders, cookies=self.cookies).json()
-                time.sleep(0.2)
-
-                if 'result' in return_data:
-                    print(f'✅{return_data["result"]}')
-                    successful_click += 1
-
-            if successful_click == 0:
-                print(f'❌未获得 x {self.click_num}')
-        except Exception as e:
-            print(f'错误信息:{e}')
+        def poke():
+            return self.send_request(url, headers=self.jwtHeaders, cookies=self.cookies,
+                                     limiter=self.burst_limiter).json()
+
+        return_list, errors = self.burst(poke, self.click_num)
+        for return_data in return_list:
+            if 'result' in return_data:
+                print(f'✅{return_data["result"]}')
+                successful_click += 1
+
+        if errors:
+            print(f'错误信息:{errors[0]}')
+        elif successful_click == 0:
+            print(f'❌未获得 x {self.click_num}')
+
+    # 并发执行count次同一个请求（戳一戳、摇一摇），返回(成功结果列表, 异常列表)
+    def burst(self, func, count):
+        results, errors = [], []
+        with ThreadPoolExecutor(max_workers=min(rate_limiter.BURST_CONCURRENCY, count)) as executor:
+            # 每个请求在当前上下文的副本中执行，指标带上账号和任务标签
+            futures = [executor.submit(contextvars.copy_context().run, func) for _ in range(count)]
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(e)
+        return results, errors
 
     # 刷新笔记token
     @catch_errors
+    @tracing.traced
     def refresh_notetoken(self):
         note_url = 'http://mnote.caiyun.feixin.10086.cn/noteServer/api/authTokenRefresh.do'
         note_payload = {
@@ -278,7 +365,6 @@ class YP:
     def get_tasklist(self, url, app_type):
         url = f'https://caiyun.feixin.10086.cn/market/signin/task/taskList?marketname={url}'
         return_data = self.send_request(url, headers=self.jwtHeaders, cookies=self.cookies).json()
-        self.sleep()
         # 任务列表
         task_list = return_data.get('result', {})
 
@@ -301,7 +387,6 @@ class YP:
                                 continue
                             print(f'-去完成: {task_name}')
                             self.do_task(task_id, task_type='month', app_type='cloud_app')
-                            time.sleep(2)
                     elif task_type == "day":
                         print('\n📆 云盘每日任务')
                         for day in tasks:
@@ -331,14 +416,13 @@ class YP:
                                 continue
                             print(f'-去完成: {task_name}')
                             self.do_task(task_id, task_type='month', app_type='email_app')
-                            time.sleep(2)
         except Exception as e:
             print(f'错误信息:{e}')
 
     # 做任务
     @catch_errors
+    @tracing.traced
     def do_task(self, task_id, task_type, app_type):
-        self.sleep()
         task_url = f'https://caiyun.feixin.10086.cn/market/signin/task/click?key=task&id={task_id}'
         self.send_request(task_url, headers=self.jwtHeaders, cookies=self.cookies)
 
@@ -387,6 +471,7 @@ class YP:
 
     # 上传文件
     @catch_errors
+    @tracing.traced
     def updata_file(self):
         url = 'http://ose.caiyun.feixin.10086.cn/richlifeApp/devapp/IUploadAndDownload'
         headers = {
@@ -406,37 +491,9 @@ class YP:
             'Content-Type': 'application/xml; charset=UTF-8',
             'Accept': '*/*'
         }
-        payload = '''
-                                <pcUploadFileRequest>
-                                    <ownerMSISDN>{phone}</ownerMSISDN>
-                                    <fileCount>1</fileCount>
-                                    <totalSize>1</totalSize>
-                                    <uploadContentList length="1">
-                                        <uploadContentInfo>
-                                            <comlexFlag>0</comlexFlag>
-                                            <contentDesc><![CDATA[]]></contentDesc>
-                                            <contentName><![CDATA[000000.txt]]></contentName>
-                                            <contentSize>1</contentSize>
-                                            <contentTAGList></contentTAGList>
-                                            <digest>C4CA4238A0B923820DCC509A6F75849B</digest>
-                                            <exif/>
-                                            <fileEtag>0</fileEtag>
-                                            <fileVersion>0</fileVersion>
-                                            <updateContentID></updateContentID>
-                                        </uploadContentInfo>
-                                    </uploadContentList>
-                                    <newCatalogName></newCatalogName>
-                                    <parentCatalogID></parentCatalogID>
-                                    <operation>0</operation>
-                                    <path></path>
-                                    <manualRename>2</manualRename>
-                                    <autoCreatePath length="0"/>
-                                    <tagID></tagID>
-                                    <tagType></tagType>
-                                </pcUploadFileRequest>
-                            '''.format(phone=self.account)
-
-        response = requests.post(url=url, headers=headers, data=payload)
+        payload = APP_UPLOAD_REQUEST.render(phone=self.account)
+
+        response = self.session.post(url=url, headers=headers, data=payload)
         if response is None:
             return
         if response.status_code != 200:
@@ -444,11 +501,12 @@ class YP:
         print('-上传文件成功')
 
     # 创建笔记
+    @tracing.traced
     def create_note(self, headers):
         note_id = self.get_note_id(32)  # 获取随机笔记id
-        createtime = str(int(round(time.time() * 1000)))
-        time.sleep(3)
-        updatetime = str(int(round(time.time() * 1000)))
+        createtime = int(round(time.time() * 1000))
+        updatetime = str(createtime + 3000)  # 修改时间比创建时间晚3秒，无需真的等待
+        createtime = str(createtime)
         note_url = 'http://mnote.caiyun.feixin.10086.cn/noteServer/api/createNote.do'
         payload = {
             "archived": 0,
@@ -511,7 +569,6 @@ class YP:
     # 公众号签到
     @catch_errors
     def wxsign(self):
-        self.sleep()
         url = 'https://caiyun.feixin.10086.cn/market/playoffic/followSignInfo?isWx=true'
         return_data = self.send_request(url, headers=self.jwtHeaders, cookies=self.cookies).json()
 
@@ -526,25 +583,24 @@ class YP:
         url = "https://caiyun.feixin.10086.cn:7071/market/shake-server/shake/shakeIt?flag=1"
         successful_shakes = 0  # 记录成功摇中的次数
 
-        try:
-            for _ in range(self.click_num):
-                return_data = self.send_request(url=url, cookies=self.cookies, headers=self.jwtHeaders,
-                                                method='POST').json()
-                time.sleep(1)
-                shake_prize_config = return_data["result"].get("shakePrizeconfig")
-
-                if shake_prize_config:
-                    print(f"🎉摇一摇获得: {shake_prize_config['name']}")
-                    successful_shakes += 1
-        except Exception as e:
-            print(f'错误信息: {e}')
+        def shake_it():
+            return_data = self.send_request(url=url, cookies=self.cookies, headers=self.jwtHeaders,
+                                            method='POST', limiter=self.burst_limiter).json()
+            return return_data["result"].get("shakePrizeconfig")
+
+        prize_list, errors = self.burst(shake_it, self.click_num)
+        for shake_prize_config in prize_list:
+            if shake_prize_config:
+                print(f"🎉摇一摇获得: {shake_prize_config['name']}")
+                successful_shakes += 1
+        if errors:
+            print(f'错误信息: {errors[0]}')
         if successful_shakes == 0:
             print(f'❌未摇中 x {self.click_num}')
 
     # 查询剩余抽奖次数
     @catch_errors
     def surplus_num(self):
-        self.sleep()
         draw_info_url = 'https://caiyun.feixin.10086.cn/market/playoffic/drawInfo'
         draw_url = "https://caiyun.feixin.10086.cn/market/playoffic/draw"
 
@@ -555,7 +611,6 @@ class YP:
             print(f'剩余抽奖次数{remain_num}')
             if remain_num > 50 - self.draw:
                 for _ in range(self.draw):
-                    self.sleep()
                     draw_data = self.send_request(url=draw_url, headers=self.jwtHeaders).json()
 
                     if draw_data.get("code") == 0:
@@ -575,7 +630,6 @@ class YP:
         token = self.sso()
         if token is not None:
             print("-果园专区token刷新成功")
-            self.sleep()
             login_info_url = f'{self.fruit_url}login/caiyunsso.do?token={token}&account={self.account}&targetSourceId=001208&sourceid=1003&enableShare=1'
             headers = {
                 'Host': 'happy.mail.10086.cn',
@@ -585,7 +639,7 @@ class YP:
                 'Referer': 'https://caiyun.feixin.10086.cn:7071/',
                 'Accept-Language': 'zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7'
             }
-            loginInfoData = requests.request("GET", login_info_url, headers=headers)
+            loginInfoData = http_pool.request("GET", login_info_url, headers=headers)
             treeCookie = loginInfoData.request.headers['Cookie']
             self.treeHeaders['cookie'] = treeCookie
 
@@ -613,7 +667,6 @@ class YP:
                                                  headers=self.treeHeaders).json()
                 if checkin_data.get('result', {}).get('code', '') == 1:
                     print('-果园签到成功')
-                self.sleep()
                 water_data = self.send_request(f'{self.fruit_url}user/clickCartoon.do?cartoonType=widget',
                                                headers=self.treeHeaders).json()
                 color_data = self.send_request(f'{self.fruit_url}user/clickCartoon.do?cartoonType=color',
@@ -694,7 +747,6 @@ class YP:
                     watering_data = self.send_request(watering_url, headers=self.treeHeaders).json()
                     if watering_data.get('success'):
                         print('✔️ 浇水成功')
-                        time.sleep(3)
             else:
                 print('-水滴不足!')
 
@@ -717,7 +769,7 @@ class YP:
             for _ in range(currnum):
                 self.send_request(bigin_url, headers=self.jwtHeaders, cookies=self.cookies).json()
                 print('-开始游戏,等待10-15秒完成游戏')
-                time.sleep(random.randint(10, 15))
+                tracing.sleep(random.randint(10, 15))
                 end_data = self.send_request(end_url, headers=self.jwtHeaders, cookies=self.cookies).json()
                 if end_data and end_data.get('code', -1) == 0:
                     print('游戏成功')
@@ -732,22 +784,16 @@ class YP:
         receive_url = "https://caiyun.feixin.10086.cn/market/signin/page/receive"
         prize_url = f"https://caiyun.feixin.10086.cn/market/prizeApi/checkPrize/getUserPrizeLogPage?currPage=1&pageSize=15&_={self.timestamp}"
         receive_data = self.send_request(receive_url, headers=self.jwtHeaders, cookies=self.cookies).json()
-        self.sleep()
         prize_data = self.send_request(prize_url, headers=self.jwtHeaders, cookies=self.cookies).json()
         result = prize_data.get('result').get('result')
-        rewards = ''
-        for value in result:
-            prizeName = value.get('prizeName')
-            flag = value.get('flag')
-            if flag == 1:
-                rewards += f'-待领取奖品: {prizeName}\n'
+        self.result.prizes = [value.get('prizeName') for value in result if value.get('flag') == 1]
 
         receive_amount = receive_data["result"].get("receive", "")
         total_amount = receive_data["result"].get("total", "")
         print(f'\n-当前待领取:{receive_amount}云朵')
         print(f'-当前云朵数量:{total_amount}云朵')
-        msg = f'云朵数量:{total_amount} \n{rewards}'
-        self.log_info(amount=msg)
+        self.result.cloud_pending = receive_amount
+        self.result.cloud_total = total_amount
 
     # 备份云朵
     @catch_errors
@@ -766,7 +812,6 @@ class YP:
 
         elif state == 1:
             print('-已领取本月连续备份奖励')
-        self.sleep()
         expend_url = 'https://caiyun.feixin.10086.cn/market/signin/page/taskExpansion'  # 每月膨胀云朵
         expend_data = self.send_request(expend_url, headers=self.jwtHeaders, cookies=self.cookies).json()
 
@@ -835,21 +880,55 @@ class YP:
             print('- 通知权限未开启')
 
 
-# 消息推送微信pushplus：需要1元实名认证费用
-def send_wx_msg(p_token, title, content):
-    if p_token is None:
-        return
-    url = 'http://www.pushplus.plus/send'
-    r = requests.get(url, params={'token': p_token,
-                                  'title': title,
-                                  'content': content})
-    print(f'微信推送结果：{r.status_code, r.text}')
+# 执行单个账号
+def run_account(index, account_info):
+    print(f"\n======== ▷ 第 {index} 个账号 ◁ ========")
+    return YP(account_info).run()
+
+
+def run_account_captured(index, account_info, outputs):
+    """并发执行时各账号的输出先写入outputs[index]，由主线程按账号顺序输出"""
+    with capture() as outputs[index]:
+        return run_account(index, account_info)
+
+
+# 多账号执行：workers为1时逐个执行，否则使用线程池并发执行
+def run_accounts(cookies, workers=WORKERS):
+    """
+    :return: ResultCollector，各账号的结果在主线程中汇总
+    """
+    collector = ResultCollector()
+    if workers <= 1:
+        for i, account_info in enumerate(cookies, start=1):
+            collector.add(run_account(i, account_info))
+            print("\n随机等待2-4s进行下一个账号")
+            tracing.sleep(random.randint(2, 4))
+        return collector
+
+    print(f"并发执行，线程数{workers}，单域名并发上限{http_pool.HOST_LIMIT}")
+    outputs = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='yp') as executor:
+        futures = [executor.submit(run_account_captured, i, account_info, outputs)
+                   for i, account_info in enumerate(cookies, start=1)]
+        # 按账号顺序等待并输出，多个账号的输出不会交错，前面的账号完成后立即输出
+        for i, future in enumerate(futures, start=1):
+            exception = future.exception()
+            emit(outputs.pop(i, None))
+            # run 已经捕获了异常，这里只兜底未预料的错误
+            if exception is not None:
+                print(f"账号执行异常: {exception}")
+            else:
+                collector.add(future.result())
+    return collector
 
 
 if __name__ == "__main__":
+    if '--profile-startup' in sys.argv:
+        profile_startup('139cloud')
+        exit(0)
+
     env_name = 'ydypCK'
     token = os.getenv(env_name)
-    PUSHPLUS_TOKEN = os.getenv('PUSHPLUS')
     if not token:
         print(f'⛔️未获取到ck变量：请检查变量 {env_name} 是否填写')
         exit(0)
@@ -857,30 +936,17 @@ if __name__ == "__main__":
     cookies = re.split(r'[@\n]', token)
     print(f"移动云盘共获取到{len(cookies)}个账号")
 
-    for i, account_info in enumerate(cookies, start=1):
-        print(f"\n======== ▷ 第 {i} 个账号 ◁ ========")
-        YP(account_info).run()
-        print("\n随机等待2-4s进行下一个账号")
-        time.sleep(random.randint(2, 4))
-
-    # 输出异常账号信息
-    if err_accounts != '':
-        msg_content = f"\n失效账号:\n{err_accounts}"
-        print(msg_content)
-        send_wx_msg(PUSHPLUS_TOKEN, '移动云盘签到异常', msg_content)
-    else:
-        print('当前所有账号ck有效')
-    if err_message != '':
-        msg_error = f'-错误信息: \n{err_message}'
-        print(msg_error)
-        send_wx_msg(PUSHPLUS_TOKEN, '移动云盘签到异常', msg_error)
-    print(user_amount)
-    # 在load_send中获取导入的send函数
-    send = load_send()
-
-    # # 判断send是否可用再进行调用
-    # if send:
-    #     msg = f"失效账号:\n{err_accounts}\n-错误信息:\n{err_message}\n-云朵数量: \n{user_amount}"
-    #     send('中国移动云盘任务信息', msg)
-    # else:
-    #     print('通知服务不可用')
+    collector = run_accounts(cookies)
+
+    # 输出异常账号信息，失效账号和错误信息合并为一条通知，在后台发送
+    msg_content, msg_error = collector.report()
+    notifier = Notifier()
+    notifier.add('移动云盘签到异常', msg_content)
+    notifier.add('移动云盘签到异常', msg_error)
+    notifier.flush()
+    http_pool.report()
+    circuit_breaker.report()
+    rate_limiter.report()
+    metrics.report()
+    tracing.report()
+    notifier.wait()
@@ -9,6 +9,7 @@
 """
 设置环境变量，ydyp_ck，格式 Basic XXXXXXXX#手机号#token
 多个账号用@分割
+YDYP_WORKERS：同时执行的账号数，默认5
 """
 import asyncio
 import json
@@ -19,12 +20,13 @@ import time
 import urllib.parse
 from datetime import datetime
 
-import httpx
-import requests
-
-from fn_print import fn_print
-
-# from sendNotify import send_notification_message_collection
+import circuit_breaker
+import http_pool
+import metrics
+import tracing
+from fn_print import fn_print, log_sink
+from notifier import Notifier
+from xml_templates import APP_UPLOAD_REQUEST
 
 ua = "Mozilla/5.0 (Linux; Android 11; M2012K10C Build/RP1A.200720.011; wv) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/90.0.4430.210 Mobile Safari/537.36 MCloudApp/10.0.1"
 
@@ -35,11 +37,12 @@ print(ydyp_ck)
 
 is_redeem = False  # 是否兑换
 redeem_reward_description = ""  # 兑换的奖品描述，比如哔哩哔哩会员月卡、网易云音乐月卡、移动云盘钻石会员季卡
+workers = max(1, int(os.getenv('YDYP_WORKERS') or 5))  # 同时执行的账号数
 
 
 class MobileCloudDisk:
     def __init__(self, cookie):
-        self.client = httpx.AsyncClient(verify=False, timeout=60)
+        self.client = http_pool.new_async_client(verify=False, timeout=60)
         self.notebook_id = None
         self.note_token = None
         self.note_auth = None
@@ -68,6 +71,7 @@ class MobileCloudDisk:
             'Referer': 'https://happy.mail.10086.cn/jsp/cn/garden/wap/index.html?sourceid=1003'
         }
 
+    @tracing.traced
     async def refresh_token(self):
         responses = await self.client.post(
             url='https://orches.yun.139.com/orchestration/auth-rebuild/token/v1.0/querySpecToken',
@@ -91,6 +95,7 @@ class MobileCloudDisk:
             fn_print(refresh_token_responses)
             return None
 
+    @tracing.traced
     async def jwt(self):
         token = await self.refresh_token()
         if token is not None:
@@ -110,6 +115,7 @@ class MobileCloudDisk:
             fn_print("cookie可能失效了")
             return False
 
+    @tracing.traced
     async def query_sign_in_status(self):
         """
         查询签到状态
@@ -131,6 +137,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"签到查询状态异常：{sign_response_datas.status_code}")
 
+    @tracing.traced
     async def a_poke(self):
         """
         戳一戳
@@ -145,7 +152,7 @@ class MobileCloudDisk:
                     headers=self.JwtHeaders,
                     cookies=self.cookies
                 )
-                time.sleep(0.5)
+                await tracing.async_sleep(0.5)
                 if responses.status_code == 200:
                     responses_data = responses.json()
                     if "result" in responses_data:
@@ -158,6 +165,7 @@ class MobileCloudDisk:
         except Exception as e:
             fn_print(f"戳一戳执行异常：{e}")
 
+    @tracing.traced
     async def refresh_notetoken(self):
         """
         刷新noteToken
@@ -194,6 +202,7 @@ class MobileCloudDisk:
         self.note_token = response.headers.get('NOTE_TOKEN')
         self.note_auth = response.headers.get('APP_AUTH')
 
+    @tracing.traced
     async def get_task_list(self, url, app_type):
         """
         获取任务列表
@@ -230,7 +239,7 @@ class MobileCloudDisk:
                                     continue
                                 fn_print(f"【{self.account}】，===任务【{task_name}】待完成✒️✒️===")
                                 await self.do_task(task_id, task_type="month", app_type="cloud_app")
-                                await asyncio.sleep(2)
+                                await tracing.async_sleep(2)
                         elif task_type == "day":
                             fn_print("\n🗓️云盘每日任务")
                             for day in tasks:
@@ -258,10 +267,11 @@ class MobileCloudDisk:
                                     continue
                                 fn_print(f"【{self.account}】，===任务【{task_name}】待完成✒️✒️===")
                                 await self.do_task(task_id, task_type="month", app_type="email_app")
-                                await asyncio.sleep(2)
+                                await tracing.async_sleep(2)
             except Exception as e:
                 fn_print(f"任务列表获取异常，错误信息：{e}")
 
+    @tracing.traced
     async def do_task(self, task_id, task_type, app_type):
         """
         执行任务
@@ -290,6 +300,7 @@ class MobileCloudDisk:
             if task_type == "month":
                 pass
 
+    @tracing.traced
     async def sign_in(self):
         """
         签到
@@ -310,6 +321,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"签到发生异常：{sign_in_response.status_code}")
 
+    @tracing.traced
     async def get_notebook_id(self):
         """
         获取笔记的默认id
@@ -350,6 +362,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"获取笔记id发生异常：{note_response.status_code}")
 
+    @tracing.traced
     async def wx_app_sign(self):
         """
         微信公众号签到
@@ -371,6 +384,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"签到发生异常：{wx_sign_response.status_code}")
 
+    @tracing.traced
     async def shake(self):
         """
         抽抽乐-享好礼
@@ -386,7 +400,7 @@ class MobileCloudDisk:
                 )
                 if responses.status_code == 200:
                     shake_response_data = responses.json()
-                    await asyncio.sleep(1)
+                    await tracing.async_sleep(1)
                     shake_prize_config = shake_response_data["result"].get("shakePrizeConfig")
                     if shake_prize_config:
                         fn_print(
@@ -401,6 +415,7 @@ class MobileCloudDisk:
         if successful_shake == 0:
             fn_print(f"用户【{self.account}】，===未抽中 x {self.click_num}❌===")
 
+    @tracing.traced
     async def surplus_num(self):
         """
         查询剩余抽奖次数
@@ -442,6 +457,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"查询剩余抽奖次数发生异常：{draw_info_response.status_code}")
 
+    @tracing.traced
     async def fruit_login(self):
         """
         果园
@@ -458,7 +474,7 @@ class MobileCloudDisk:
                 'Referer': 'https://caiyun.feixin.10086.cn:7071/',
                 'Accept-Language': 'zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7'
             }
-            login_info_data = requests.request("""GET""", login_info_url, headers=headers, verify=False)
+            login_info_data = await self.client.get(login_info_url, headers=headers, follow_redirects=True)
             treeCookie = login_info_data.request.headers['Cookie']
             self.treetHeaders['Cookie'] = treeCookie
             do_login_url = f'{self.fruit_url}login/userinfo.do'
@@ -477,6 +493,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"用户【{self.account}】，===果园专区Token刷新失败❌===")
 
+    @tracing.traced
     async def fruit_task(self):
         """
         果园专区任务
@@ -563,6 +580,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"签到请求发生异常：{check_sign_responses.status_code}")
 
+    @tracing.traced
     async def do_fruit_task(self, task_name, task_id, water_num):
         """
         执行果园任务
@@ -599,6 +617,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"任务执行请求发生异常：{do_task_response.status_code}")
 
+    @tracing.traced
     async def tree_info(self):
         """
         查询果园信息
@@ -643,7 +662,7 @@ class MobileCloudDisk:
                                 fn_print(f"用户【{self.account}】，===已完成{index + 1}次浇水🌊🌊===")
                             else:
                                 fn_print(f"用户【{self.account}】，===浇水失败❌, {watering_data.get('msg')}===")
-                            await asyncio.sleep(3)
+                            await tracing.async_sleep(3)
                         else:
                             fn_print(f"浇水请求发生异常：{watering_response.status_code}")
                 else:
@@ -651,6 +670,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"查询果园信息请求发生异常：{tree_info_responses.status_code}")
 
+    @tracing.traced
     async def cloud_game(self):
         """
         云朵大作战
@@ -678,7 +698,7 @@ class MobileCloudDisk:
                         cookies=self.cookies
                     )
                     fn_print("开始游戏， 等待10-15秒完成游戏")
-                    await asyncio.sleep(random.randint(10, 15))
+                    await tracing.async_sleep(random.randint(10, 15))
                     end_response = await self.client.get(
                         url=end_url,
                         headers=self.JwtHeaders,
@@ -697,6 +717,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"云朵大作战请求发生异常：{game_info_response.status_code}")
 
+    @tracing.traced
     async def receive(self):
         """
         领取云朵
@@ -736,6 +757,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"领取奖品请求发生异常：{prize_response.status_code}")
 
+    @tracing.traced
     async def backup_cloud(self):
         """
         备份云朵
@@ -816,6 +838,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"用户【{self.account}】，===上月未备份，本月暂无膨胀云朵===")
 
+    @tracing.traced
     async def open_send(self):
         """
         通知云朵
@@ -864,6 +887,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"用户【{self.account}】，===开启通知云朵请求失败❌，{send_response.status_code}===")
 
+    @tracing.traced
     async def create_note(self, headers):
         """
         创建笔记
@@ -871,7 +895,7 @@ class MobileCloudDisk:
         """
         note_id = await self.random_genner_note_id(length=32)
         create_time = str(int(round(time.time() * 1000)))
-        await asyncio.sleep(3)
+        await tracing.async_sleep(3)
         update_time = str(int(round(time.time() * 1000)))
         create_note_url = 'http://mnote.caiyun.feixin.10086.cn/noteServer/api/createNote.do'
         payload = {
@@ -930,6 +954,7 @@ class MobileCloudDisk:
         else:
             fn_print(f"创建笔记发生异常：{create_note_response.status_code}")
 
+    @tracing.traced
     async def upload_file(self):
         """
         上传文件
@@ -945,8 +970,7 @@ class MobileCloudDisk:
             'Host': 'ose.caiyun.feixin.10086.cn', 'User-Agent': 'okhttp/3.11.0',
             'Content-Type': 'application/xml; charset=UTF-8', 'Accept': '*/*'
         }
-        payload = '''                                <pcUploadFileRequest>                                    <ownerMSISDN>{phone}</ownerMSISDN>                                    <fileCount>1</fileCount>                                    <totalSize>1</totalSize>                                    <uploadContentList length="1">                                        <uploadContentInfo>                                            <comlexFlag>0</comlexFlag>                                            <contentDesc><![CDATA[]]></contentDesc>                                            <contentName><![CDATA[000000.txt]]></contentName>                                            <contentSize>1</contentSize>                                            <contentTAGList></contentTAGList>                                            <digest>C4CA4238A0B923820DCC509A6F75849B</digest>                                            <exif/>                                            <fileEtag>0</fileEtag>                                            <fileVersion>0</fileVersion>                                            <updateContentID></updateContentID>                                        </uploadContentInfo>                                    </uploadContentList>                                    <newCatalogName></newCatalogName>                                    <parentCatalogID></parentCatalogID>                                    <operation>0</operation>                                    <path></path>                                    <manualRename>2</manualRename>                                    <autoCreatePath length="0"/>                                    <tagID></tagID>                                    <tagType></tagType>                                </pcUploadFileRequest>                            '''.format(
-            phone=self.account)
+        payload = APP_UPLOAD_REQUEST.render(phone=self.account)
         response = await self.client.post(
             url=url,
             headers=headers,
@@ -960,13 +984,14 @@ class MobileCloudDisk:
 
     async def rm_sleep(self, min_delay=1, max_delay=1.5):
         delay = random.uniform(min_delay, max_delay)
-        await asyncio.sleep(delay)
+        await tracing.async_sleep(delay)
 
     async def random_genner_note_id(self, length):
         characters = '19f3a063d67e4694ca63a4227ec9a94a19088404f9a28084e3e486b928039a299bf756ebc77aa4f6bfa250308ec6a8be8b63b5271a00350d136d117b8a72f39c5bd15cdfd350cba4271dc797f15412d9f269e666aea5039f5049d00739b320bb9e8585a008b52c1cbd86970cae9476446f3e41871de8d9f6112db94b05e5dc7ea0a942a9daf145ac8e487d3d5cba7cea145680efc64794d43dd15c5062b81e1cda7bf278b9bc4e1b8955846e6bc4b6a61c28f831f81b2270289e5a8a677c3141ddc9868129060c0c3b5ef507fbd46c004f6de346332ef7f05c0094215eae1217ee7c13c8dca6d174cfb49c716dd42903bb4b02d823b5f1ff93c3f88768251b56cc'
         note_id = ''.join(random.choice(characters) for _ in range(length))
         return note_id
 
+    @tracing.traced
     async def get_redeemable_reward_list(self):
         """
         获取可兑换奖励
@@ -1001,6 +1026,7 @@ class MobileCloudDisk:
         except Exception as e:
             fn_print(f"获取可兑换奖励请求发生异常：{e}")
 
+    @tracing.traced
     async def redeem_reward(self, oid):
         """
         兑换奖励
@@ -1028,27 +1054,39 @@ class MobileCloudDisk:
             fn_print(f"❌兑换奖励请求发生异常：{e}")
 
     async def run(self):
-        if await self.jwt():
+        try:
+            with metrics.labels(account=self.encrypt_account), tracing.track(self.encrypt_account):
+                await self.run_tasks()
+        finally:
+            await self.client.aclose()
+
+    async def run_task(self, name, coroutine):
+        """执行一个任务，期间发出的请求在指标中带上任务标签"""
+        with metrics.labels(task=name):
+            return await coroutine
+
+    async def run_tasks(self):
+        if await self.run_task('jwt', self.jwt()):
             fn_print("=========开始签到=========")
-            await self.query_sign_in_status()
+            await self.run_task('query_sign_in_status', self.query_sign_in_status())
             fn_print("=========开始执行戳一戳=========")
-            await self.a_poke()
-            await self.get_task_list(url="sign_in_3", app_type="cloud_app")
+            await self.run_task('a_poke', self.a_poke())
+            await self.run_task('cloud_tasklist', self.get_task_list(url="sign_in_3", app_type="cloud_app"))
             # fn_print("=========开始执行☁️云朵大作战=========")
-            # await self.cloud_game()
+            # await self.run_task('cloud_game', self.cloud_game())
             # fn_print("=========开始执行🌳果园任务=========")
-            # await self.fruit_login()
+            # await self.run_task('fruit_login', self.fruit_login())
             fn_print("=========开始执行📝公众号任务=========")
-            await self.wx_app_sign()
-            await self.shake()
-            await self.surplus_num()
+            await self.run_task('wx_app_sign', self.wx_app_sign())
+            await self.run_task('shake', self.shake())
+            await self.run_task('surplus_num', self.surplus_num())
             fn_print("=========开始执行🔥热门任务=========")
-            await self.backup_cloud()
-            await self.open_send()
+            await self.run_task('backup_cloud', self.backup_cloud())
+            await self.run_task('open_send', self.open_send())
             fn_print("=========开始执行📮139邮箱任务=========")
-            await self.get_task_list(url="newsign_139mail", app_type="email_app")
-            await self.receive()
-            reward_list = await self.get_redeemable_reward_list()
+            await self.run_task('email_tasklist', self.get_task_list(url="newsign_139mail", app_type="email_app"))
+            await self.run_task('receive', self.receive())
+            reward_list = await self.run_task('reward_list', self.get_redeemable_reward_list())
             if is_redeem and reward_list:
                 fn_print("=========开始🎁兑换奖励=========")
                 found = False
@@ -1056,7 +1094,7 @@ class MobileCloudDisk:
                     if reward.get("prizeName") == redeem_reward_description:
                         oid = reward.get("oid")
                         if oid:
-                            await self.redeem_reward(oid)
+                            await self.run_task('redeem_reward', self.redeem_reward(oid))
                             found = True
                             break
                 if not found:
@@ -1066,14 +1104,41 @@ class MobileCloudDisk:
             fn_print("token失效")
 
 
+async def run_account(semaphore, index, cookie):
+    # 每个账号的输出单独记录，并发执行时互不混杂
+    with log_sink.partition(f'账号{index}'):
+        async with semaphore:
+            fn_print(f"\n======== ▷ 第 {index} 个账号 ◁ ========")
+            try:
+                await MobileCloudDisk(cookie).run()
+            except Exception as e:
+                fn_print(f"第 {index} 个账号执行异常：{e}")
+
+
 async def main():
-    tasks = []
+    if not ydyp_ck:
+        fn_print(f"⛔️未获取到ck变量：请检查变量 {env_name} 是否填写")
+        return
+    cookies = [cookie for cookie in re.split(r'[@\n]', ydyp_ck) if cookie.strip()]
+    fn_print(f"移动云盘共获取到{len(cookies)}个账号，同时执行{workers}个")
 
-    mobileCloudDisk = MobileCloudDisk(ydyp_ck)
-    tasks.append(mobileCloudDisk.run())
-    await asyncio.gather(*tasks)
+    # 所有账号在同一个事件循环中执行，用信号量限制同时执行的账号数
+    semaphore = asyncio.Semaphore(workers)
+    await asyncio.gather(*(run_account(semaphore, i, cookie) for i, cookie in enumerate(cookies, start=1)))
+    # 通知只需要每个账号最后几行输出，不包括下面的统计
+    summary = log_sink.summary()
+    http_pool.report(fn_print)
+    circuit_breaker.report(fn_print)
+    metrics.report(fn_print)
+    tracing.report(fn_print)
+    return summary
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
-    # send_notification_message_collection(f"中国移动云盘签到通知 - {datetime.now().strftime('%Y/%m/%d')}")
+    summary = asyncio.run(main())
+    # 在后台发送通知
+    notifier = Notifier(printer=fn_print)
+    notifier.add(f"中国移动云盘签到通知 - {datetime.now().strftime('%Y/%m/%d')}", summary)
+    notifier.flush()
+    notifier.wait()
+    log_sink.close()
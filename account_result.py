@@ -0,0 +1,86 @@
+# -*- coding=UTF-8 -*-
+# 每个账号的执行结果：YP.run() 返回一个结果对象，结束后由 ResultCollector 统一汇总输出，
+# 账号之间不共享可变状态，并发执行时无需加锁
+import time
+
+OK = 'ok'
+INVALID = 'invalid'  # ck失效，未能获取jwtToken
+FAILED = 'failed'  # 执行过程中有错误
+
+
+class AccountResult:
+    __slots__ = ('account', 'status', 'cloud_total', 'cloud_pending', 'prizes', 'errors', 'timings',
+                 'started', 'finished')
+
+    def __init__(self, account):
+        """
+        :param account: 脱敏后的手机号
+        """
+        self.account = account
+        self.status = OK
+        self.cloud_total = None  # 当前云朵数量
+        self.cloud_pending = None  # 待领取云朵
+        self.prizes = []  # 待领取奖品
+        self.errors = []  # list.append是原子操作，账号内并发的任务可以直接追加
+        self.timings = {}  # 任务名 -> 耗时（秒）
+        self.started = self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self.errors and self.status == OK:
+            self.status = FAILED
+
+    @property
+    def elapsed(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    def amount_text(self):
+        """与原来汇总的云朵数量格式相同"""
+        rewards = ''.join(f'-待领取奖品: {prize}\n' for prize in self.prizes)
+        return f'用户[{self.account}]:云朵数量:{self.cloud_total} \n{rewards}'
+
+
+class ResultCollector:
+    def __init__(self):
+        self.results = []
+
+    def add(self, result):
+        if result is not None:
+            self.results.append(result)
+        return result
+
+    def invalid_accounts(self):
+        return [result.account for result in self.results if result.status == INVALID]
+
+    def error_text(self):
+        return ''.join(f'用户[{result.account}]:{error}\n' for result in self.results for error in result.errors)
+
+    def amount_text(self):
+        return ''.join(result.amount_text() + '\n' for result in self.results if result.cloud_total is not None)
+
+    def report(self, printer=print):
+        """
+        输出汇总
+        :return: (失效账号信息, 错误信息)，没有时为空字符串，用于推送
+        """
+        invalid = ''.join(f'{account}\n' for account in self.invalid_accounts())
+        invalid_msg = error_msg = ''
+        if invalid:
+            invalid_msg = f"\n失效账号:\n{invalid}"
+            printer(invalid_msg)
+        else:
+            printer('当前所有账号ck有效')
+        errors = self.error_text()
+        if errors:
+            error_msg = f'-错误信息: \n{errors}'
+            printer(error_msg)
+        printer(self.amount_text())
+        elapsed = [result.elapsed for result in self.results if result.finished is not None]
+        if elapsed:
+            printer(f'共{len(self.results)}个账号，单账号耗时 最长{max(elapsed):.1f}s 平均{sum(elapsed) / len(elapsed):.1f}s')
+        return invalid_msg, error_msg
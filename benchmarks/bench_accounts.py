@@ -0,0 +1,94 @@
+# -*- coding=UTF-8 -*-
+# 多账号执行耗时对比：139cloud.py 逐个执行 vs 线程池执行，139cloud22.py 逐个执行 vs 异步并发执行
+# 两个脚本单个账号的任务和请求数不同（139cloud.py 账号内的任务也并发执行），只比较同一脚本的两种执行方式
+# 请求全部发往本地模拟服务器（mock_server.py），脚本里的固定等待和限速按 --sleep-scale 缩放，避免测试过久；
+# 只缩放脚本自己的等待（tracing.sleep / tracing.async_sleep），模拟服务器的请求延迟不受影响
+# 用法：python benchmarks/bench_accounts.py --accounts 10 --delay 20 --sleep-scale 0.01
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mock_server  # noqa: E402
+import tracing  # noqa: E402
+
+
+def load_script(filename, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def scale_sleeps(scale):
+    """
+    按比例缩短脚本里的等待（都经过 tracing.sleep / tracing.async_sleep）；
+    不修改全局的 time.sleep / asyncio.sleep，模拟服务器的延迟保持不变。
+    限速等待不缩放：令牌桶按真实时间补充令牌，改为放大速率
+    """
+    raw_sleep, raw_async_sleep = tracing.sleep, tracing.async_sleep
+
+    def sleep(seconds, name='sleep'):
+        raw_sleep(seconds if name == 'rate_limit' else seconds * scale, name)
+
+    async def async_sleep(seconds, name='sleep'):
+        await raw_async_sleep(seconds if name == 'rate_limit' else seconds * scale, name)
+
+    tracing.sleep, tracing.async_sleep = sleep, async_sleep
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--delay', type=float, default=20, help='模拟服务器每个请求延迟，毫秒')
+    parser.add_argument('--sleep-scale', type=float, default=0.01)
+    args = parser.parse_args()
+
+    server, url = mock_server.start_server(delay=args.delay / 1000)
+    os.environ[mock_server.MOCK_ENV] = url
+    os.environ['YDYP_WORKERS'] = str(args.workers)
+    cookies = [f'Basic mock{i}#138{i:08d}#token' for i in range(args.accounts)]
+    os.environ['ydypCK'] = '@'.join(cookies)
+    os.environ['YDYP_TOKEN_CACHE'] = ''
+    import rate_limiter
+    rate_limiter.ACCOUNT_RATE /= args.sleep_scale
+    rate_limiter.HOST_RATE /= args.sleep_scale
+    rate_limiter.BURST_RATE /= args.sleep_scale
+    scale_sleeps(args.sleep_scale)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cloud = load_script('139cloud.py', 'cloud139')
+        cloud22 = load_script('139cloud22.py', 'cloud139_22')
+
+    sequential = timed(lambda: cloud.run_accounts(cookies, workers=1))
+    threaded = timed(lambda: cloud.run_accounts(cookies, workers=args.workers))
+    cloud22.workers = 1
+    sequential22 = timed(lambda: asyncio.run(cloud22.main()))
+    cloud22.workers = args.workers
+    async_run = timed(lambda: asyncio.run(cloud22.main()))
+    server.shutdown()
+
+    print(f'账号数: {args.accounts}  并发数: {args.workers}  请求延迟: {args.delay}ms  等待缩放: {args.sleep_scale}')
+    print(f'139cloud.py 逐个执行:     {sequential:.2f}s')
+    print(f'139cloud.py 线程池执行:   {threaded:.2f}s  ({sequential / threaded:.1f}x)')
+    print(f'139cloud22.py 逐个执行:   {sequential22:.2f}s')
+    print(f'139cloud22.py 异步执行:   {async_run:.2f}s  ({sequential22 / async_run:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
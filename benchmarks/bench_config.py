@@ -0,0 +1,67 @@
+# -*- coding=UTF-8 -*-
+# Config.set 写入性能：每次set都写文件 vs batch()批量写入 vs 多线程debounce合并写入
+# 用法：python benchmarks/bench_config.py --keys 200 --threads 8
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import SCHEMA, Config  # noqa: E402
+
+
+def new_config(directory, debounce=0):
+    path = os.path.join(directory, 'config.yaml')
+    shutil.copy(os.path.join(ROOT, 'config.yaml'), path)
+    return Config(path, SCHEMA, debounce=debounce)
+
+
+def run_each(config, keys, threads):
+    for i in range(keys):
+        config.set(f'accounts_state.a{i}.last_run', i)
+
+
+def run_batch(config, keys, threads):
+    with config.batch():
+        run_each(config, keys, threads)
+
+
+def run_debounce(config, keys, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for t in range(threads):
+            executor.submit(lambda t=t: [config.set(f'accounts_state.a{t}_{i}.last_run', i)
+                                         for i in range(keys // threads)])
+    config.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keys', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--debounce', type=float, default=0.05, help='debounce模式的合并时间，秒')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        for label, func, debounce in (('每次写入', run_each, 0), ('batch', run_batch, 0),
+                                      ('debounce', run_debounce, args.debounce)):
+            config = new_config(directory, debounce)
+            start = time.perf_counter()
+            func(config, args.keys, args.threads)
+            elapsed = time.perf_counter() - start
+            print(f'{label:<8} {args.keys}次set 耗时{elapsed:.3f}s  {args.keys / elapsed:8.0f}次set/s  '
+                  f'写入文件{config.writes}次')
+            # 重新读取文件，确认所有修改都已写入
+            saved = len(Config(config.config_file).get('accounts_state', {}))
+            assert saved == len(config.get('accounts_state')), saved
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# -*- coding=UTF-8 -*-
+# 入口脚本冷启动耗时：每个入口模块在新的子进程中导入多次，取中位数（-X importtime 统计的导入耗时和进程总耗时）
+# 用法：python benchmarks/bench_startup.py --runs 15
+#      python benchmarks/bench_startup.py --root /path/to/other/checkout  对比其他版本
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module, root):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'__import__({module!r})'], cwd=root,
+                            capture_output=True, text=True, check=True).stderr
+    elapsed = time.perf_counter() - start
+    match = re.search(rf'^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$', output, re.M)
+    return int(match.group(1)) / 1000, elapsed * 1000, output.count('import time:')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--root', default=ROOT)
+    parser.add_argument('modules', nargs='*', default=['main', '139cloud', '139cloud22'])
+    args = parser.parse_args()
+
+    for module in args.modules:
+        results = [measure(module, args.root) for _ in range(args.runs)]
+        import_ms = statistics.median(result[0] for result in results)
+        total_ms = statistics.median(result[1] for result in results)
+        print(f'{module:<12} 导入 {import_ms:6.1f}ms  进程总耗时 {total_ms:6.1f}ms  导入模块数 {results[0][2]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# -*- coding=UTF-8 -*-
+# tracing 开销：未启用/启用时每个span的耗时，以及一个任务中（1个任务span + N次请求的net/parse span）
+# 相对于本地模拟服务器上一次请求耗时的占比
+# 用法：python benchmarks/bench_tracing.py --spans 200000
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tracing  # noqa: E402
+
+
+def per_span(tracer, spans):
+    start = time.perf_counter()
+    with tracing.track('138****0001'):
+        for _ in range(spans):
+            with tracer.span('GET caiyun.feixin.10086.cn/market/signin/page/info', tracing.NET):
+                pass
+    return (time.perf_counter() - start) / spans
+
+
+def per_request(requests_num):
+    import mock_server
+    server, url = mock_server.start_server()
+    os.environ.update(YDYP_MOCK_URL=url, YDYP_HOST_RATE='0')
+    import http_pool
+    session = http_pool.new_session()
+    target = 'https://caiyun.feixin.10086.cn/market/signin/page/info'
+    session.get(target).json()
+    start = time.perf_counter()
+    for _ in range(requests_num):
+        session.get(target).json()
+    elapsed = (time.perf_counter() - start) / requests_num
+    server.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--spans', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    disabled = per_span(tracing.Tracer(enabled=False), args.spans)
+    enabled_tracer = tracing.Tracer(enabled=True, max_events=args.spans)
+    enabled = per_span(enabled_tracer, args.spans)
+    print(f'未启用 每个span {disabled * 1e6:.2f}µs')
+    print(f'启用   每个span {enabled * 1e6:.2f}µs  记录{len(enabled_tracer.events)}个')
+
+    request = per_request(args.requests)
+    # 每次请求产生 net + parse 两个span
+    print(f'本地模拟服务器一次请求 {request * 1e3:.2f}ms，启用追踪增加约 {2 * enabled / request:.2%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding=UTF-8 -*-
+# 上传文件准备阶段的内存/耗时对比：原来的 os.urandom 整块生成 + hashlib.md5 vs UploadSource 分块生成和计算
+# 每种方式在独立子进程中运行，以便分别统计峰值内存（ru_maxrss）
+# 用法：python benchmarks/bench_upload.py --size-mb 7 64
+import argparse
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run_mode(mode, size, path):
+    from upload_source import UploadSource
+
+    start = time.perf_counter()
+    if mode == 'urandom':
+        data = os.urandom(size)
+        digest = hashlib.md5(data).hexdigest().upper()
+    elif mode == 'random':
+        digest = UploadSource.random(size).md5()
+    elif mode == 'path':
+        digest = UploadSource.from_path(path).md5()
+    else:
+        digest = UploadSource.from_mmap(path).md5()
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{elapsed:.3f} {peak_mb:.1f} {digest[:8]}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=int, nargs='+', default=[7, 64])
+    args = parser.parse_args()
+
+    for size_mb in args.size_mb:
+        size = size_mb * 1024 * 1024
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+            path = f.name
+        try:
+            print(f'\n文件大小 {size_mb}MB')
+            for mode in ('urandom', 'random', 'path', 'mmap'):
+                output = subprocess.run([sys.executable, __file__, '--child', mode, str(size), path],
+                                        capture_output=True, text=True, check=True).stdout.split()
+                print(f'{mode:>8}: 耗时 {float(output[0]):.3f}s  峰值内存 {output[1]}MB')
+        finally:
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_mode(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    else:
+        main()
@@ -0,0 +1,255 @@
+# -*- coding=UTF-8 -*-
+# 分片上传：解析 IUploadAndDownload 返回的上传地址，按分片并发上传文件内容，失败后可从已确认的分片继续
+# 断点按 账号+文件摘要 记录，同时保存上传地址（ticket），下次运行上传同一文件时直接用保存的ticket继续，不重新申请
+# 环境变量：
+#   YDYP_PART_SIZE       分片大小（字节），默认4MB
+#   YDYP_UPLOAD_WORKERS  同时上传的分片数，默认3
+#   YDYP_UPLOAD_ROUNDS   一次运行中分片重试用完后，用同一个ticket重新上传剩余分片的轮数，默认3
+#   YDYP_UPLOAD_STATE    断点记录目录，默认脚本目录下的 .upload_state
+import contextvars
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+from xml.etree.ElementTree import ParseError
+
+import requests
+
+import metrics
+import tracing
+from retry_policy import default_policy
+from xml_templates import parse_fields
+
+PART_SIZE = int(os.getenv('YDYP_PART_SIZE') or 4 * 1024 * 1024)
+UPLOAD_WORKERS = max(1, int(os.getenv('YDYP_UPLOAD_WORKERS') or 3))
+UPLOAD_ROUNDS = max(1, int(os.getenv('YDYP_UPLOAD_ROUNDS') or 3))
+STATE_DIR = os.getenv('YDYP_UPLOAD_STATE') or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                          '.upload_state')
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadTicket:
+    """pcUploadFileRequest 的返回结果"""
+    __slots__ = ('result_code', 'redirection_url', 'upload_task_id', 'content_id', 'need_upload')
+
+    def __init__(self, result_code, redirection_url, upload_task_id, content_id, need_upload):
+        self.result_code = result_code
+        self.redirection_url = redirection_url
+        self.upload_task_id = upload_task_id
+        self.content_id = content_id
+        self.need_upload = need_upload
+
+    @property
+    def ok(self):
+        return self.result_code in ('', '0')
+
+    def to_dict(self):
+        return {'redirection_url': self.redirection_url, 'upload_task_id': self.upload_task_id,
+                'content_id': self.content_id}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls('0', data.get('redirection_url', ''), data.get('upload_task_id', ''), data.get('content_id', ''),
+                   need_upload=True)
+
+    @classmethod
+    def parse(cls, xml_bytes):
+        """
+        解析返回的XML，格式如：
+        <result resultCode="0"><pcUploadFileResult><redirectionUrl>..</redirectionUrl>
+        <newContentIDList><newContent><contentID>..</contentID><isNeedUpload>1</isNeedUpload></newContent>
+        </newContentIDList><uploadTaskID>..</uploadTaskID></pcUploadFileResult></result>
+        """
+        try:
+            fields = parse_fields(xml_bytes, ('redirectionUrl', 'uploadTaskID', 'contentID', 'isNeedUpload'),
+                                  attrs=('resultCode',))
+        except ParseError as e:
+            raise UploadError(f'上传返回结果无法解析: {e}') from None
+        return cls(
+            result_code=fields.get('resultCode', ''),
+            redirection_url=fields.get('redirectionUrl', ''),
+            upload_task_id=fields.get('uploadTaskID', ''),
+            content_id=fields.get('contentID', ''),
+            # 服务器已有相同文件时（秒传）不需要上传内容
+            need_upload=fields.get('isNeedUpload', '1') != '0',
+        )
+
+
+class UploadStats:
+    __slots__ = ('parts', 'skipped_parts', 'resumed_from', 'bytes_sent', 'retries', 'rounds', 'elapsed')
+
+    def __init__(self):
+        self.parts = self.skipped_parts = self.resumed_from = self.bytes_sent = self.retries = self.rounds = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        """上传速度，MB/s"""
+        return self.bytes_sent / 1024 / 1024 / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        resumed = f'，从{self.resumed_from}字节处继续' if self.resumed_from else ''
+        return (f'分片{self.parts}个（跳过已上传{self.skipped_parts}个{resumed}），'
+                f'发送{self.bytes_sent / 1024 / 1024:.1f}MB，重试{self.retries}次，上传{self.rounds}轮，'
+                f'耗时{self.elapsed:.2f}s，速度{self.throughput:.1f}MB/s')
+
+
+def state_key(account, source):
+    """断点记录的文件名：同一账号上传同一内容时相同，与每次申请的uploadTaskID无关"""
+    return hashlib.md5(f'{account}:{source.md5()}:{source.size}'.encode()).hexdigest()
+
+
+def _read_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def saved_ticket(key, state_dir=STATE_DIR):
+    """
+    上次未完成的上传保存的ticket
+    :param key: state_key()
+    :return: UploadTicket，没有时返回None
+    """
+    state = _read_state(os.path.join(state_dir, f'{key}.json')) if state_dir else None
+    if not state or not state.get('ticket', {}).get('upload_task_id'):
+        return None
+    return UploadTicket.from_dict(state['ticket'])
+
+
+class ChunkedUploader:
+    def __init__(self, session, source, ticket, key=None, part_size=PART_SIZE, workers=UPLOAD_WORKERS,
+                 state_dir=STATE_DIR, retry_policy=default_policy):
+        """
+        :param session: requests.Session（http_pool.new_session()）
+        :param source: UploadSource
+        :param ticket: UploadTicket
+        :param key: 断点记录名，一般为 state_key(账号, source)，默认用uploadTaskID
+        """
+        self.session = session
+        self.source = source
+        self.ticket = ticket
+        self.part_size = part_size
+        self.workers = workers
+        self.retry_policy = retry_policy
+        self.state_path = os.path.join(state_dir, f'{key or ticket.upload_task_id}.json') if state_dir else None
+        self.stats = UploadStats()
+        self._lock = threading.Lock()
+        self.done = self._load_state()
+
+    def _load_state(self):
+        """读取断点：只有同一文件、同样分片大小、同一个上传任务的记录才可复用"""
+        state = _read_state(self.state_path) if self.state_path else None
+        if not state:
+            return set()
+        saved = (state.get('size'), state.get('md5'), state.get('part_size'),
+                 state.get('ticket', {}).get('upload_task_id'))
+        if saved != (self.source.size, self.source.md5(), self.part_size, self.ticket.upload_task_id):
+            return set()
+        return set(state.get('done', []))
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        directory = os.path.dirname(self.state_path)
+        os.makedirs(directory, exist_ok=True)
+        state = {'size': self.source.size, 'md5': self.source.md5(), 'part_size': self.part_size,
+                 'ticket': self.ticket.to_dict(), 'done': sorted(self.done)}
+        fd, tmp_path = tempfile.mkstemp(prefix='.upload.', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _clear_state(self):
+        if self.state_path and os.path.exists(self.state_path):
+            os.unlink(self.state_path)
+
+    @property
+    def acked_offset(self):
+        """已确认的连续上传位置，之前的内容都已上传成功"""
+        index = 0
+        while index in self.done:
+            index += 1
+        return min(index * self.part_size, self.source.size)
+
+    def _upload_part(self, index, budget):
+        start = index * self.part_size
+        data = self.source.read_range(start, min(self.part_size, self.source.size - start))
+        headers = {
+            'Accept': '*/*',
+            'Content-Type': f'text/plain;name={quote(self.source.name)}',
+            'contentSize': str(self.source.size),
+            'range': f'bytes={start}-{start + len(data) - 1}',
+            'uploadtaskID': self.ticket.upload_task_id,
+            'rangeType': '0',
+        }
+        attempt = 0
+        while True:
+            status = retry_after = None
+            try:
+                response = self.session.post(self.ticket.redirection_url, headers=headers, data=data, timeout=120)
+                if response.status_code < 400:
+                    break
+                status, retry_after = response.status_code, response.headers.get('Retry-After')
+                error = UploadError(f'分片{index}上传失败，状态码{status}')
+            except requests.RequestException as e:
+                error = UploadError(f'分片{index}上传失败: {e}')
+            delay = self.retry_policy.next_delay(attempt, budget, status, retry_after)
+            if delay is None:
+                raise error
+            with self._lock:
+                self.stats.retries += 1
+            metrics.record_retry('POST', self.ticket.redirection_url)
+            tracing.sleep(delay, 'retry')
+            attempt += 1
+
+        with self._lock:
+            self.done.add(index)
+            self.stats.bytes_sent += len(data)
+            self._save_state()
+
+    def _upload_round(self, todo):
+        budget = self.retry_policy.new_budget()
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(todo) or 1)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, self._upload_part, index, budget)
+                       for index in todo]
+            for future in as_completed(futures):
+                future.result()
+
+    def upload(self, rounds=UPLOAD_ROUNDS):
+        """
+        上传所有未确认的分片；某一轮的重试用完后，用同一个ticket从断点继续上传剩余分片，最多rounds轮，
+        仍失败时抛出UploadError，断点（包括ticket）已保存，下次运行会继续上传
+        :return: UploadStats
+        """
+        if not self.ticket.redirection_url or not self.ticket.upload_task_id:
+            raise UploadError('返回结果中没有上传地址')
+        total = max(1, -(-self.source.size // self.part_size))
+        self.stats.parts = total
+        self.stats.skipped_parts = len(self.done)
+        self.stats.resumed_from = self.acked_offset
+        # 先记录ticket，第一个分片就失败时下次运行也能用同一个ticket继续
+        self._save_state()
+        start = time.perf_counter()
+        try:
+            for round_index in range(rounds):
+                self.stats.rounds = round_index + 1
+                try:
+                    self._upload_round([index for index in range(total) if index not in self.done])
+                    break
+                except UploadError:
+                    if round_index == rounds - 1:
+                        raise
+        finally:
+            self.stats.elapsed = time.perf_counter() - start
+        self._clear_state()
+        return self.stats
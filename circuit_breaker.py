@@ -0,0 +1,102 @@
+# -*- coding=UTF-8 -*-
+# 按域名的熔断器：连续失败达到阈值后熔断，冷却期内直接失败，冷却结束后放行一个探测请求
+import os
+import threading
+import time
+
+CLOSED = 'closed'  # 正常
+OPEN = 'open'  # 熔断，直接失败
+HALF_OPEN = 'half_open'  # 冷却结束，探测中
+
+
+class CircuitOpenError(Exception):
+    """域名处于熔断状态，请求未发出"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f'{host} 已熔断，{retry_in:.0f}秒后重试')
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(self, host, failure_threshold=5, cool_down=30.0, clock=time.monotonic):
+        """
+        :param host: 域名
+        :param failure_threshold: 连续失败多少次后熔断
+        :param cool_down: 熔断持续时间（秒）
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0  # 被直接拒绝的请求数
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """请求前调用，熔断时抛出CircuitOpenError"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.cool_down - self.clock()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.host, max(remaining, 0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """请求没有得到结果（被取消、非网络原因的异常）时调用，不改变状态，探测请求由下一个请求重新发出"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f'⚡️{self.host} 连续失败{self.failures}次，熔断{self.cool_down:.0f}秒')
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+
+FAILURE_THRESHOLD = int(os.getenv('YDYP_BREAKER_THRESHOLD') or 5)
+COOL_DOWN = float(os.getenv('YDYP_BREAKER_COOLDOWN') or 30)
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def breaker_for(host):
+    """获取域名对应的熔断器，同一进程内所有账号共享"""
+    with _lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host, FAILURE_THRESHOLD, COOL_DOWN)
+        return breaker
+
+
+def is_failure_status(status):
+    """5xx视为服务端故障，4xx说明服务是通的"""
+    return status >= 500
+
+
+def report(printer=print):
+    tripped = [breaker for breaker in _breakers.values() if breaker.rejected or breaker.state != CLOSED]
+    if not tripped:
+        return
+    printer('\n⚡️ 熔断统计')
+    for breaker in tripped:
+        printer(f'-{breaker.host}: 状态{breaker.state}，直接拒绝{breaker.rejected}个请求')
@@ -1,58 +1,296 @@
+import atexit
+import os
+import tempfile
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from types import MappingProxyType
+
 import yaml
 
+_MISSING = object()
+
+# set() 之后延迟多少秒再写入文件，期间的其他修改合并为一次写入；0为立即写入
+DEBOUNCE = float(os.getenv('YDYP_CONFIG_DEBOUNCE') or 0)
+
+# 配置项类型和默认值：键 -> (类型, 默认值)，默认值与缺少该项时原来的行为一致
+SCHEMA = {
+    'caiyun.token': (str, None),
+    'caiyun.phone': (str, None),
+    'caiyun.upload_dirid': (str, None),
+    'caiyun.AccountType': (int, 0),
+    'share.enable': (bool, True),
+    'share.filename': (str, ''),
+    'upload.enable': (bool, True),
+    'daemon.window': (int, 30),
+    'daemon.catch_up': (int, 12),
+}
+
+# accounts 列表中每个账号可填写的设置 -> 未填写时继承的全局设置
+ACCOUNT_KEYS = {
+    'token': 'caiyun.token',
+    'phone': 'caiyun.phone',
+    'upload_dirid': 'caiyun.upload_dirid',
+    'AccountType': 'caiyun.AccountType',
+    'share.enable': 'share.enable',
+    'share.filename': 'share.filename',
+    'upload.enable': 'upload.enable',
+}
+
+
+def _freeze(value):
+    """逐层转换为只读对象：dict -> MappingProxyType，list -> tuple，set -> frozenset，与 self.config 不共享可变对象"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+def _flatten(data, prefix='', flat=None):
+    """把嵌套的dict展开为 点分隔键 -> 值，中间层级的dict也保留，get('caiyun')仍然可用"""
+    flat = {} if flat is None else flat
+    for key, value in data.items():
+        path = f'{prefix}{key}'
+        flat[path] = value
+        if isinstance(value, Mapping):
+            _flatten(value, f'{path}.', flat)
+    return flat
+
+
+def _coerce(key, value, expected):
+    if value is None or isinstance(value, expected):
+        return value
+    # yaml会把手机号解析成int、把'1'解析成str，这类可以无损转换的值直接转换
+    if expected is bool:
+        if isinstance(value, str) and value.lower() in ('true', 'false'):
+            return value.lower() == 'true'
+    elif not isinstance(value, (Mapping, tuple, list, bool)):
+        try:
+            return expected(value)
+        except (TypeError, ValueError):
+            pass
+    raise TypeError(f"Config key {key} must be {expected.__name__}, received: {value!r}")
+
 
 class Config:
-    def __init__(self, config_file):
+    def __init__(self, config_file, schema=None, debounce=DEBOUNCE):
         self.config_file = config_file
+        self.schema = schema or {}
+        self.debounce = debounce
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        self._timer = None
+        self.writes = 0  # 实际写入文件的次数
         print(f"Loading config from: {self.config_file}")
         self.config = {}
+        self.snapshot = MappingProxyType({})
+        self._accounts = ()
+        self._stale = False  # batch() 中set()后快照尚未更新
+        self._mtime = None
         self.load_config()
 
     def get(self, key, default=None):
         if not isinstance(key, str):
             raise TypeError(f"The key must be a string, received key: {key}")
-
-        current = self.config
-        parts = key.split('.')
-
-        for part in parts:
-            if isinstance(current, dict) and part in current:
-                current = current[part]
-            else:
-                return default
-        return current
+        if self._stale:
+            self._refresh()
+        value = self.snapshot.get(key, _MISSING)
+        return default if value is _MISSING else value
 
     def set(self, key, value):
         if not isinstance(key, str):
             raise TypeError(f"The key must be a string, received key: {key}")
 
-        current = self.config
+        with self._lock:
+            current = self.config
+            parts = key.split('.')
+            # 先按schema校验本次设置的键，不合法时配置不会被修改；accounts 的校验依赖整个列表，在展开时进行
+            if parts[0] != 'accounts':
+                self._validate(key, value)
+            # batch() 中退出时（或之后第一次读取时）再统一展开，批量设置不必每次重建快照
+            deferred = self._batch_depth > 0 and parts[0] != 'accounts'
+
+            for part in parts[:-1]:
+                if part not in current:
+                    current[part] = {}
+                elif not isinstance(current[part], dict):
+                    current[part] = {}
+                current = current[part]
+
+            previous = current.get(parts[-1], _MISSING)
+            current[parts[-1]] = value
+            if deferred:
+                self._stale = True
+                self._schedule_save()
+                return
+            try:
+                self._compile()
+            except TypeError:
+                # 不符合schema的值不写入
+                if previous is _MISSING:
+                    del current[parts[-1]]
+                else:
+                    current[parts[-1]] = previous
+                raise
+            self._schedule_save()
+
+    def _validate(self, key, value):
+        """按schema校验一次set()：设置的键和值中嵌套的键，以及会被替换为dict的上层键"""
+        flat = {key: value}
+        if isinstance(value, Mapping):
+            _flatten(value, f'{key}.', flat)
+        for path, item in flat.items():
+            if path in self.schema:
+                _coerce(path, item, self.schema[path][0])
         parts = key.split('.')
+        for index in range(1, len(parts)):
+            parent = '.'.join(parts[:index])
+            if parent in self.schema:
+                raise TypeError(f"Config key {parent} must be {self.schema[parent][0].__name__}, "
+                                f"cannot set {key}")
 
-        for part in parts[:-1]:
-            if part not in current:
-                current[part] = {}
-            elif not isinstance(current[part], dict):
-                current[part] = {}
-            current = current[part]
+    def _refresh(self):
+        with self._lock:
+            if self._stale:
+                self._compile()
 
-        current[parts[-1]] = value
-        self.save_config()
+    def _compile(self):
+        """展开为只读快照，按schema校验类型并补全默认值，之后每次get只需一次dict查找"""
+        flat = _flatten(_freeze(self.config))
+        for key, (expected, default) in self.schema.items():
+            value = flat.get(key)
+            flat[key] = default if value is None else _coerce(key, value, expected)
+        self.snapshot = MappingProxyType(flat)
+        self._stale = False
+        self._accounts = self._compile_accounts()
+
+    def _compile_accounts(self):
+        entries = self.get('accounts') or [{}]
+        if not isinstance(entries, (tuple, list)):
+            raise TypeError(f"Config key accounts must be a list, received: {entries!r}")
+        accounts = []
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, Mapping):
+                raise TypeError(f"Config key accounts[{index}] must be a mapping, received: {entry!r}")
+            flat = _flatten(entry)
+            account = {}
+            for key, global_key in ACCOUNT_KEYS.items():
+                value = flat.get(key)
+                if value is None:
+                    account[key] = self.get(global_key)
+                elif global_key in self.schema:
+                    account[key] = _coerce(f'accounts[{index}].{key}', value, self.schema[global_key][0])
+                else:
+                    account[key] = value
+            accounts.append(MappingProxyType(account))
+        return tuple(accounts)
+
+    def accounts(self):
+        """
+        账号列表：config.yaml 中 accounts 列表的每一项，未填写的设置继承 caiyun/share/upload 中的设置；
+        没有 accounts 时只有 caiyun 中配置的一个账号
+        :return: tuple，每项为只读dict，键见 ACCOUNT_KEYS
+        """
+        if self._stale:
+            self._refresh()
+        return self._accounts
+
+    def _stat_mtime(self):
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
 
     def load_config(self):
+        self._mtime = self._stat_mtime()
         try:
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 loaded = yaml.safe_load(f)
                 self.config = loaded if loaded is not None else {}
         except FileNotFoundError:
             self.config = {}
+        self._compile()
+
+    def reload_if_changed(self):
+        """
+        配置文件的修改时间变化时重新加载，长时间运行的定时任务每次执行前调用，未变化时只有一次stat
+        :return: 是否重新加载
+        """
+        if self._stat_mtime() == self._mtime:
+            return False
+        print(f"Reloading config from: {self.config_file}")
+        self.load_config()
+        return True
+
+    @contextmanager
+    def batch(self):
+        """
+        批量修改，期间的set()都只修改内存并只校验设置的键，退出时展开一次快照、写入一次文件，可嵌套
+        with config.batch():
+            config.set('a.b', 1)
+            config.set('a.c', 2)
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    if self._stale:
+                        self._compile()
+                    if self._dirty:
+                        self._schedule_save()
+
+    def _schedule_save(self):
+        self._dirty = True
+        if self._batch_depth:
+            return
+        if self.debounce <= 0:
+            self.save_config()
+        elif self._timer is None:
+            # 多个线程在debounce时间内的修改合并为一次写入
+            self._timer = threading.Timer(self.debounce, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self.save_config()
 
     def save_config(self):
-        with open(self.config_file, 'w') as f:
-            yaml.dump(self.config, f)
+        # 先写临时文件并fsync，再原子替换，写入中断不会留下不完整的配置文件
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.config_file))
+            fd, tmp_path = tempfile.mkstemp(prefix='.config.', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    yaml.dump(self.config, f, allow_unicode=True)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(self.config_file):
+                    os.chmod(tmp_path, os.stat(self.config_file).st_mode & 0o777)
+                os.replace(tmp_path, self.config_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
+            self.writes += 1
+            self._mtime = self._stat_mtime()
 
 
-config = Config('config.yaml')
+config = Config('config.yaml', SCHEMA)
+atexit.register(config.flush)
 
 if __name__ == '__main__':
     config2 = Config('config.yaml')
@@ -0,0 +1,83 @@
+# -*- coding=UTF-8 -*-
+# 文件夹内容索引：按账号和文件夹id保存 文件名 -> 文件id，同时记录文件夹的更新时间
+# 更新时间不变时直接从索引查找，不再逐页列出文件夹
+# 环境变量：YDYP_FILE_INDEX  索引文件路径，默认脚本目录下的 .file_index.json，设为空字符串关闭
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.file_index.json')
+
+
+class FileIndex:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, data):
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(prefix='.file_index.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def lookup(self, account, folder_id, version, keyword):
+        """
+        在索引中查找文件名包含keyword的文件
+        :param version: 文件夹当前的更新时间，与索引记录的不同时视为失效
+        :return: (文件名, 文件id)，索引失效或没有找到时返回None
+        """
+        if not self.path or not version:
+            return None
+        with self._lock:
+            entry = self._load().get(f'{account}:{folder_id}')
+        if not entry or entry.get('version') != version:
+            return None
+        files = entry.get('files', {})
+        if keyword in files:
+            return keyword, files[keyword]
+        # 与列表顺序一致，返回第一个包含keyword的文件
+        return next(((name, file_id) for name, file_id in files.items() if keyword in name), None)
+
+    def update(self, account, folder_id, version, files):
+        """
+        保存文件夹内容（可以只是已列出的部分）
+        :param files: {文件名: 文件id}，按列表顺序
+        """
+        if not self.path or not version:
+            return
+        with self._lock:
+            data = self._load()
+            data[f'{account}:{folder_id}'] = {'version': version, 'files': files}
+            self._save(data)
+
+    def touch(self, account, folder_id, old_version, version):
+        """
+        文件夹只是新增了本账号上传的文件时，把索引记录更新到新的更新时间
+        :param old_version: 上传前的更新时间，索引记录的不是这个时间（期间有其他变化）时不更新
+        """
+        if not self.path or not old_version or not version:
+            return
+        with self._lock:
+            data = self._load()
+            entry = data.get(f'{account}:{folder_id}')
+            if not entry or entry.get('version') != old_version:
+                return
+            entry['version'] = version
+            self._save(data)
+
+
+file_index = FileIndex(os.getenv('YDYP_FILE_INDEX', DEFAULT_PATH))
@@ -3,21 +3,159 @@
 # @fileName         fn_print.py
 # @author           Echo
 # @EditTime         2024/9/24
+# 输出同时记录到 log_sink：按账号分区，每个分区只在内存中保留最近的若干行（环形缓冲），
+# 需要完整日志时可同时写入文件；发送通知时只读取需要的末尾几行
+# capture()：并发执行的任务各自缓存print输出，由调用者按顺序输出，避免多个任务的输出交错
+# 环境变量：
+#   YDYP_LOG_LINES  每个账号在内存中保留的行数，默认200
+#   YDYP_LOG_FILE   完整日志写入的文件，默认不写
+import contextvars
+import os
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
 from typing import *
 
-all_print_list = []
+MAX_LINES = max(1, int(os.getenv('YDYP_LOG_LINES') or 200))
+
+# 当前输出所属的账号；asyncio的每个任务、每个线程各自独立
+_partition = contextvars.ContextVar('fn_print_partition', default='')
+# 当前上下文的输出缓存，None时直接输出
+_capture = contextvars.ContextVar('fn_print_capture', default=None)
+_install_lock = threading.Lock()
+
+
+class _CapturingStdout:
+    """sys.stdout的代理：当前上下文在 capture() 中时写入缓存，否则写入原来的输出流"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        buffer = _capture.get()
+        if buffer is None:
+            return self._stream.write(text)
+        buffer.append(text)
+        return len(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def capture():
+    """
+    此上下文中（包括复制了此上下文的线程）print和fn_print的输出先写入返回的列表，
+    退出后由调用者用 emit() 输出；嵌套时输出到外层的缓存
+    """
+    with _install_lock:
+        if not isinstance(sys.stdout, _CapturingStdout):
+            sys.stdout = _CapturingStdout(sys.stdout)
+    buffer = []
+    token = _capture.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _capture.reset(token)
+
+
+def emit(buffer):
+    """输出 capture() 缓存的内容，写入当前上下文（外层的缓存或原来的输出流）"""
+    if buffer:
+        sys.stdout.write(''.join(buffer))
+
+
+class LogSink:
+    def __init__(self, max_lines=MAX_LINES, spill_path=None, stream=None):
+        """
+        :param max_lines: 每个分区保留的行数
+        :param spill_path: 完整日志文件，为空时不写文件
+        :param stream: 输出流，默认sys.stdout（使用时再取，便于重定向）
+        """
+        self.max_lines = max_lines
+        self.spill_path = spill_path
+        self.stream = stream
+        self.partitions = {}  # 分区名 -> deque
+        self.dropped = {}  # 分区名 -> 超出容量被丢弃的行数
+        self._spill = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def partition(self, name):
+        """此上下文中（包括其中创建的asyncio任务）的输出记录到name分区"""
+        token = _partition.set(str(name))
+        try:
+            yield
+        finally:
+            _partition.reset(token)
+
+    def write(self, text):
+        name = _partition.get()
+        lines = self.partitions.get(name)
+        if lines is None:
+            lines = self.partitions.setdefault(name, deque(maxlen=self.max_lines))
+        if len(lines) == lines.maxlen:
+            self.dropped[name] = self.dropped.get(name, 0) + 1
+        lines.append(text)
+        # 一次write代替print逐个参数写入；stdout本身带缓冲
+        (self.stream or sys.stdout).write(text)
+        if self.spill_path:
+            with self._lock:
+                if self._spill is None:
+                    self._spill = open(self.spill_path, 'a', encoding='utf-8', buffering=64 * 1024)
+                self._spill.write(f'[{name}] {text}' if name else text)
+
+    def tail(self, name=None, lines=None):
+        """
+        :param name: 分区名，None为当前分区
+        :param lines: 最后几行，None为保留的全部
+        """
+        buffered = self.partitions.get(_partition.get() if name is None else str(name), ())
+        selected = list(buffered)[-lines:] if lines else list(buffered)
+        return ''.join(selected)
+
+    def summary(self, lines=20):
+        """每个分区的最后几行，用于推送通知，不会随账号数和日志量无限增长"""
+        parts = []
+        for name in self.partitions:
+            text = self.tail(name, lines).strip('\n')
+            if text:
+                parts.append(f'{name}\n{text}' if name else text)
+        return '\n\n'.join(parts)
+
+    def lines(self):
+        """所有分区保留的行"""
+        return [line for partition in list(self.partitions.values()) for line in list(partition)]
+
+    def flush(self):
+        (self.stream or sys.stdout).flush()
+        with self._lock:
+            if self._spill is not None:
+                self._spill.flush()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+log_sink = LogSink(spill_path=os.getenv('YDYP_LOG_FILE') or None)
 
 
 def fn_print(*args, sep=' ', end='\n', **kwargs):
-    global all_print_list
-    output = ""
-    # 构建输出字符串
-    for index, arg in enumerate(args):
-        if index == len(args) - 1:
-            output += str(arg)
-            continue
-        output += str(arg) + sep
-    output = output + end
-    all_print_list.append(output)
-    # 调用内置的 print 函数打印字符串
-    print(*args, sep=sep, end=end, **kwargs)
\ No newline at end of file
+    if kwargs.get('file') is not None:
+        print(*args, sep=sep, end=end, **kwargs)
+        return
+    log_sink.write(sep.join(map(str, args)) + end)
+    if kwargs.get('flush'):
+        log_sink.flush()
+
+
+def __getattr__(name):
+    # 兼容原来读取 all_print_list 的通知脚本，只能取到各分区保留的行
+    if name == 'all_print_list':
+        return log_sink.lines()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
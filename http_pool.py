@@ -0,0 +1,205 @@
+# -*- coding=UTF-8 -*-
+# 进程内共享的HTTP连接池
+# 所有账号的requests.Session共用同一个HTTPAdapter，httpx客户端共用同一个transport，
+# 这样同一域名的TCP/TLS连接可以在账号之间复用；每个账号的Session仍然独立，cookie互不影响。
+# 每个域名有一个共享的熔断器（circuit_breaker.py），域名故障时请求直接失败，不再逐个超时重试。
+# 每个域名有一个共享的令牌桶（rate_limiter.py），限制所有账号合计的请求速率。
+# 环境变量：
+#   YDYP_POOL_SIZE   每个域名保持的连接数，默认16
+#   YDYP_HOST_LIMIT  同一域名同时进行的最大请求数，默认8
+#   YDYP_HTTP2       设为0关闭HTTP/2（仅httpx，且需要安装h2）
+import importlib.util
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import tracing
+from circuit_breaker import CircuitOpenError, breaker_for, is_failure_status
+from lazy_import import lazy_import
+from rate_limiter import limiter_for
+from retry_policy import default_policy
+
+# 只有模拟服务器和httpx客户端才用到，延迟到第一次使用时导入（分别会导入http.server和asyncio）
+# 只在事件循环所在线程中使用；LazyLoader在Python 3.10/3.11上不是线程安全的，多线程用到的模块不能延迟导入
+asyncio = lazy_import('asyncio')
+
+POOL_SIZE = max(1, int(os.getenv('YDYP_POOL_SIZE') or 16))
+HOST_LIMIT = max(1, int(os.getenv('YDYP_HOST_LIMIT') or 8))
+
+# 只检查h2是否安装，不导入
+HTTP2 = importlib.util.find_spec('h2') is not None and os.getenv('YDYP_HTTP2') != '0'
+
+_lock = threading.Lock()
+_host_semaphores = {}
+_adapter = None
+_async_transport = None
+_async_loop = None
+_async_stats = {}  # 域名 -> [请求数, 连接集合]
+
+
+# 按域名限制并发请求数，所有账号共享
+def host_slot(url):
+    host = urlsplit(url).netloc
+    with _lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = _host_semaphores[host] = threading.BoundedSemaphore(HOST_LIMIT)
+    return semaphore
+
+
+def redirect(url):
+    """设置了 YDYP_MOCK_URL 时把请求转发到模拟服务器"""
+    if not os.getenv('YDYP_MOCK_URL'):
+        return url
+    # 多个线程会同时调用，这里普通导入，不使用lazy_import
+    import mock_server
+    return mock_server.redirect(url)
+
+
+def body_size(body, headers):
+    """请求体字节数，流式请求体取Content-Length"""
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    return int(headers.get('Content-Length') or 0)
+
+
+class TracedResponse(requests.Response):
+    """启用追踪时使用，response.json() 记录为解析耗时"""
+
+    def json(self, **kwargs):
+        with tracing.span('json', tracing.PARSE):
+            return super().json(**kwargs)
+
+
+class HostUnavailable(CircuitOpenError, requests.ConnectionError):
+    """熔断时抛出，可按requests.ConnectionError处理"""
+
+
+class SharedAdapter(HTTPAdapter):
+    """被多个Session共用的适配器，Session.close()不会关闭共享连接"""
+
+    def send(self, request, **kwargs):
+        breaker = breaker_for(urlsplit(request.url).netloc)
+        try:
+            breaker.allow()
+        except CircuitOpenError as e:
+            raise HostUnavailable(e.host, e.retry_in) from None
+        # 指标按原始地址记录，重定向到模拟服务器时接口名不变
+        url = request.url
+        try:
+            limiter_for(breaker.host).acquire()
+            request.url = redirect(url)
+            bytes_out = body_size(request.body, request.headers)
+            start = time.perf_counter()
+            with host_slot(request.url), tracing.span(metrics.endpoint(request.method, url), tracing.NET):
+                response = super().send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            breaker.record_failure()
+            metrics.record(request.method, url, time.perf_counter() - start, None, bytes_out)
+            raise
+        except BaseException:
+            # 其他异常不计为域名故障，但要放行下一个探测请求，否则半开状态的域名会一直被拒绝
+            breaker.release()
+            raise
+        if is_failure_status(response.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if kwargs.get('stream') or 'Content-Length' in response.headers:
+            bytes_in = int(response.headers.get('Content-Length') or 0)
+        else:
+            bytes_in = len(response.content)
+        metrics.record(request.method, url, time.perf_counter() - start, response.status_code, bytes_out, bytes_in)
+        if tracing.tracer.enabled:
+            response.__class__ = TracedResponse
+        return response
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
+
+def get_adapter():
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = SharedAdapter(pool_connections=16, pool_maxsize=POOL_SIZE)
+        return _adapter
+
+
+def new_session():
+    """创建一个使用共享连接池的Session，每个账号一个"""
+    session = requests.Session()
+    adapter = get_adapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def request(method, url, **kwargs):
+    """一次性请求（代替 requests.request），同样走共享连接池"""
+    return new_session().request(method, url, **kwargs)
+
+
+def get_async_transport():
+    """返回当前事件循环共享的httpx transport"""
+    global _async_transport, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_transport is None or _async_loop is not loop:
+        # 连接绑定在事件循环上，换了事件循环需要重新创建
+        _async_transport = _create_async_transport()
+        _async_loop = loop
+    return _async_transport
+
+
+def _create_async_transport():
+    from http_pool_async import create_transport
+    return create_transport(POOL_SIZE, HTTP2)
+
+
+def new_async_client(retry_policy=default_policy, **kwargs):
+    """创建一个使用共享transport、带重试的httpx异步客户端，每个账号一个"""
+    from http_pool_async import RetryAsyncClient
+    return RetryAsyncClient(transport=get_async_transport(), retry_policy=retry_policy, **kwargs)
+
+
+def stats():
+    """
+    连接复用统计
+    :return: {域名: (请求数, 新建连接数)}
+    """
+    result = {}
+    if _adapter is not None:
+        pools = _adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_num, connections = result.get(pool.host, (0, 0))
+            result[pool.host] = (requests_num + pool.num_requests, connections + pool.num_connections)
+    for host, (requests_num, streams) in _async_stats.items():
+        old_requests, old_connections = result.get(host, (0, 0))
+        result[host] = (old_requests + requests_num, old_connections + len(streams))
+    return result
+
+
+def report(printer=print):
+    """打印连接复用情况"""
+    result = stats()
+    if not result:
+        return
+    printer(f'\n🔗 连接复用统计 (HTTP/2: {"开启" if HTTP2 else "关闭"})')
+    for host, (requests_num, connections) in sorted(result.items()):
+        reuse = 1 - connections / requests_num if requests_num else 0
+        printer(f'-{host}: 请求{requests_num}次，新建连接{connections}个，复用率{reuse:.0%}')
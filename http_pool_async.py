@@ -0,0 +1,111 @@
+# -*- coding=UTF-8 -*-
+# http_pool 中httpx部分（139cloud22.py使用），单独成模块，139cloud.py 和 main.py 不会导入httpx和asyncio
+import time
+
+import httpx
+
+import metrics
+import tracing
+from circuit_breaker import CircuitOpenError, breaker_for, is_failure_status
+from http_pool import _async_stats, body_size, redirect
+from rate_limiter import limiter_for
+from retry_policy import default_policy
+
+
+def create_transport(pool_size, http2):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=pool_size * 4)
+    return SharedAsyncTransport(verify=False, http2=http2, limits=limits)
+
+
+class TracedAsyncResponse(httpx.Response):
+    """启用追踪时使用，response.json() 记录为解析耗时"""
+
+    def json(self, **kwargs):
+        with tracing.span('json', tracing.PARSE):
+            return super().json(**kwargs)
+
+
+class AsyncHostUnavailable(CircuitOpenError, httpx.ConnectError):
+    """熔断时抛出，可按httpx.ConnectError处理"""
+
+
+class SharedAsyncTransport(httpx.AsyncHTTPTransport):
+    """被多个客户端共用的transport，客户端aclose()不会关闭共享连接"""
+
+    async def handle_async_request(self, request):
+        breaker = breaker_for(request.url.netloc.decode())
+        try:
+            breaker.allow()
+        except CircuitOpenError as e:
+            raise AsyncHostUnavailable(e.host, e.retry_in) from None
+        url = str(request.url)
+        try:
+            await limiter_for(breaker.host).acquire_async()
+            request.url = httpx.URL(redirect(url))
+            bytes_out = body_size(request.content if isinstance(request.stream, httpx.ByteStream) else None,
+                                  request.headers)
+            start = time.perf_counter()
+            with tracing.span(metrics.endpoint(request.method, url), tracing.NET):
+                response = await super().handle_async_request(request)
+        except httpx.TransportError:
+            # 包括连接异常、超时和协议错误（如复用已被服务器关闭的连接时的RemoteProtocolError）
+            breaker.record_failure()
+            metrics.record(request.method, url, time.perf_counter() - start, None, bytes_out)
+            raise
+        except BaseException:
+            # 任务被取消等其他异常不计为域名故障，但要放行下一个探测请求，否则半开状态的域名会一直被拒绝
+            breaker.release()
+            raise
+        if is_failure_status(response.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        # 响应体此时还未读取，接收字节数取Content-Length，耗时为收到响应头的时间
+        metrics.record(request.method, url, time.perf_counter() - start, response.status_code, bytes_out,
+                       int(response.headers.get('Content-Length') or 0))
+        if tracing.tracer.enabled:
+            response.__class__ = TracedAsyncResponse
+        stats = _async_stats.setdefault(request.url.host, [0, set()])
+        stats[0] += 1
+        stats[1].add(response.extensions.get('network_stream'))
+        return response
+
+    async def aclose(self):
+        pass
+
+    async def shutdown(self):
+        await super().aclose()
+
+
+class RetryAsyncClient(httpx.AsyncClient):
+    """按RetryPolicy重试网络异常和可重试状态码，重试预算按客户端（账号）计算"""
+
+    def __init__(self, *args, retry_policy=default_policy, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_policy = retry_policy
+        self.retry_budget = retry_policy.new_budget()
+
+    async def send(self, request, **kwargs):
+        url = request.url  # transport会把request.url改为重定向后的地址
+        attempt = 0
+        while True:
+            try:
+                response = await super().send(request, **kwargs)
+            except CircuitOpenError:
+                raise
+            except httpx.TransportError:
+                delay = self.retry_policy.next_delay(attempt, self.retry_budget)
+                if delay is None:
+                    raise
+                metrics.record_retry(request.method, url)
+            else:
+                if response.status_code < 400:
+                    return response
+                delay = self.retry_policy.next_delay(attempt, self.retry_budget, response.status_code,
+                                                     response.headers.get('Retry-After'))
+                if delay is None:
+                    return response
+                metrics.record_retry(request.method, url)
+                await response.aclose()
+            await tracing.async_sleep(delay, 'retry')
+            attempt += 1
@@ -0,0 +1,56 @@
+# -*- coding=UTF-8 -*-
+# 延迟导入：先返回一个模块对象，第一次访问其属性时才真正执行模块代码，
+# 用于只在部分流程中才用到、导入又比较慢的模块（asyncio、httpx等）
+# 注意：Python 3.10/3.11的LazyLoader不是线程安全的，多个线程同时第一次访问时可能拿到未执行完的模块，
+# 只对在单个线程中使用的模块延迟导入
+# 启动耗时分析：python main.py --profile-startup / python 139cloud.py --profile-startup
+import importlib.util
+import re
+import subprocess
+import sys
+
+
+def lazy_import(name, optional=False):
+    """
+    :param name: 模块名
+    :param optional: 模块不存在时返回None，而不是抛出ImportError
+    :return: 模块对象（已导入时直接返回已导入的模块）
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        if optional:
+            return None
+        raise ImportError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+_IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def profile_startup(module, top=15, printer=print):
+    """
+    在子进程中以 -X importtime 导入入口模块，按累计耗时列出最慢的顶层导入
+    :param module: 入口模块名，如 'main'、'139cloud'
+    :return: 导入总耗时（毫秒）
+    """
+    command = [sys.executable, '-X', 'importtime', '-c', f'__import__({module!r})']
+    output = subprocess.run(command, capture_output=True, text=True).stderr
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(cumulative_us), int(self_us), len(indent) // 2, name))
+    total = next((row[0] for row in rows if row[3] == module), 0) / 1000
+    printer(f'导入 {module} 共耗时 {total:.1f}ms，最慢的模块（累计/自身，毫秒）：')
+    for cumulative_us, self_us, depth, name in sorted(rows, reverse=True)[:top]:
+        printer(f'{cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {"  " * depth}{name}')
+    return total
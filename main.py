@@ -1,16 +1,35 @@
-import hashlib
-import requests
+import circuit_breaker
+import http_pool
+import metrics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
 from loguru import logger
+from chunk_upload import ChunkedUploader, UploadError, UploadTicket, saved_ticket, state_key
 from config import config
+from file_index import file_index
+from lazy_import import profile_startup
+from payload_cache import payload_cache
+from scheduler import DEFAULT_STATE as SCHEDULE_STATE, DailyScheduler
+from token_cache import EXPIRY_MARGIN, DEFAULT_TTL, jwt_expiry, token_cache
+from upload_source import UploadSource
+from xml_templates import PC_UPLOAD_REQUEST
+import argparse
 import json
-import schedule
+import requests
+import threading
 import time
 import os
-import xml.etree.ElementTree as ET
+
+# 多账号时同时运行的账号数，环境变量 YDYP_WORKERS，默认3
+WORKERS = max(1, int(os.getenv('YDYP_WORKERS') or 3))
 
 
 class CaiYun:
-    def __init__(self, token: str, account: str):
+    def __init__(self, token: str, account: str, settings=None):
+        """
+        :param settings: 账号设置，config.accounts() 中的一项，未传入时使用 config.yaml 中的全局设置
+        """
         self.auth_token = token
         self.url = 'https://caiyun.feixin.10086.cn'
         self.headers = {
@@ -23,7 +42,14 @@ class CaiYun:
         self.cookies = {
             "jwtToken": ""
         }
+        self.jwt_expires_at = 0
         self.account = str(account)
+        self.encrypt_account = self.account[:3] + "*" * 4 + self.account[7:]
+        self.settings = settings if settings is not None else config.accounts()[0]
+        self.session = http_pool.new_session()
+        self.session.hooks['response'].append(self.check_unauthorized)
+        # 本次运行中查找文件时看到的文件夹更新时间，上传后据此更新文件索引
+        self.folder_versions = {}
 
     def fetch_ssoToken(self):
         url = 'https://orches.yun.139.com/orchestration/auth-rebuild/token/v1.0/querySpecToken?client=app'
@@ -39,33 +65,69 @@ class CaiYun:
             "account": self.account,
             "toSourceId": "001003"
         }
-        if config.get('caiyun.AccountType') == 1:
+        if self.settings['AccountType'] == 1:
             url = 'https://user-njs.yun.139.com/user/querySpecToken'
             headers['Host'] = 'user-njs.yun.139.com'
             data = {
                 "phoneNumber": self.account,
                 "toSourceId": "001003"
             }
-        resp = requests.post(url, headers=headers, data=json.dumps(data)).json()
+        resp = self.session.post(url, headers=headers, data=json.dumps(data)).json()
         if resp['success'] == True:
             new_token = resp['data']['token']
             return new_token
         return [False, resp['message']]
 
-    def fetch_jwtToken(self):
+    def check_unauthorized(self, resp, *args, **kwargs):
+        """
+        缓存的jwtToken已失效时清除缓存并重新获取，用新的jwtToken重新发送一次请求
+        :return: 重新发送的响应，不需要重新发送时返回None（使用原响应）
+        """
+        request = resp.request
+        if resp.status_code != 401 or not request.headers.get('jwtToken') or getattr(request, 'jwt_retried', False):
+            return None
+        logger.warning('jwtToken已失效，重新获取')
+        if self.fetch_jwtToken(refresh=True) is not True:
+            return None
+        retry = request.copy()
+        retry.jwt_retried = True
+        retry.headers['jwtToken'] = self.headers['jwtToken']
+        # cookie中也带有jwtToken，按新的值重新生成Cookie请求头
+        retry.headers.pop('Cookie', None)
+        jar = requests.cookies.merge_cookies(requests.cookies.RequestsCookieJar(), self.session.cookies)
+        retry.prepare_cookies(requests.cookies.merge_cookies(jar, self.cookies))
+        return self.session.send(retry, **kwargs)
+
+    def set_jwtToken(self, jwt_token):
+        self.headers['jwtToken'] = jwt_token
+        self.cookies['jwtToken'] = jwt_token
+        self.jwt_expires_at = (jwt_expiry(jwt_token) or time.time() + DEFAULT_TTL) if jwt_token else 0
+
+    def fetch_jwtToken(self, refresh=False):
+        # 常驻运行时同一对象再次执行，内存中的jwtToken未过期则直接使用
+        if not refresh and self.headers['jwtToken'] and self.jwt_expires_at - EXPIRY_MARGIN > time.time():
+            return True
+        cached_token = None if refresh else token_cache.get(self.account)
+        if cached_token is not None:
+            logger.debug("use cached jwtToken")
+            self.set_jwtToken(cached_token)
+            return True
+        if refresh:
+            token_cache.invalidate(self.account)
+            self.set_jwtToken("")
         ssoToken = self.fetch_ssoToken()
         logger.debug(f"use ssoToken: {ssoToken}")
         url = f"https://caiyun.feixin.10086.cn:7071/portal/auth/tyrzLogin.action?ssoToken={ssoToken}"
-        resp = requests.get(url, headers=self.headers).json()
+        resp = self.session.get(url, headers=self.headers).json()
         if resp['code'] != 0:
             return [False, resp['msg']]
-        self.headers['jwtToken'] = resp['result']['token']
-        self.cookies['jwtToken'] = resp['result']['token']
+        self.set_jwtToken(resp['result']['token'])
+        token_cache.set(self.account, resp['result']['token'])
         return True
 
     def sign(self):
         checkSign_url = f"{self.url}/market/signin/page/infoV2?client=mini"
-        c_resp = requests.get(checkSign_url, headers=self.headers, cookies=self.cookies).json()
+        c_resp = self.session.get(checkSign_url, headers=self.headers, cookies=self.cookies).json()
         if c_resp.get('msg') == 'success':
             issign = c_resp.get('result').get('todaySignIn', False)
             if issign == True:
@@ -74,7 +136,7 @@ class CaiYun:
             else:
                 logger.info('今日未签到，正在开始签到')
                 signurl = f'{self.url}/market/manager/commonMarketconfig/getByMarketRuleName?marketName=sign_in_3'
-                resp = requests.get(signurl, headers=self.headers, cookies=self.cookies).json()
+                resp = self.session.get(signurl, headers=self.headers, cookies=self.cookies).json()
                 if resp['msg'] == 'success':
                     logger.success("签到成功")
                     return True
@@ -85,40 +147,35 @@ class CaiYun:
             logger.warning(f"检测签到状态失败，原因 {c_resp['msg']}")
             return False
 
-    def upload(self, file_bytes):
-        if config.get('upload.enable') == False:
+    def upload(self, source):
+        """
+        上传文件
+        :param source: UploadSource（文件路径、mmap、生成器），或bytes
+        """
+        if self.settings['upload.enable'] == False:
             logger.info('上传功能未开启，跳过')
             return True
-        data = f"""
-        <pcUploadFileRequest>
-            <ownerMSISDN>{self.account}</ownerMSISDN>
-            <fileCount>1</fileCount>
-            <totalSize>{len(file_bytes)}</totalSize>
-            <uploadContentList length="1">
-            <uploadContentInfo>
-                <contentName><![CDATA[7]]></contentName>
-                <contentSize>{len(file_bytes)}</contentSize>
-                <contentDesc></contentDesc>
-                <contentTAGList></contentTAGList>
-                <comlexFlag>0</comlexFlag>
-                <comlexCID></comlexCID>
-                <resCID length="0"></resCID>
-                <digest>{hashlib.md5(file_bytes).hexdigest().upper()}</digest>
-                <extInfo length="1">
-                    <entry>
-                        <key>modifyTime</key>
-                        <vaule>{time.strftime('%Y%m%d%H%M%S')}</vaule>
-                    </entry>
-                </extInfo>
-            </uploadContentInfo>
-            </uploadContentList>
-            <newCatalogName></newCatalogName>
-            <parentCatalogID>{config.get('caiyun.upload_dirid')}</parentCatalogID>
-            <operation>0</operation>
-            <path></path>
-            <manualRename>2</manualRename>
-        </pcUploadFileRequest>
-        """
+        if not isinstance(source, UploadSource):
+            source = UploadSource.from_bytes(source)
+        # 上次运行没有传完同一内容时，用保存的上传地址从断点继续；失败（如地址已过期）再重新申请
+        key = state_key(self.account, source)
+        ticket = saved_ticket(key)
+        if ticket is not None:
+            try:
+                stats = ChunkedUploader(self.session, source, ticket, key).upload()
+                logger.success(f"继续上次的上传成功，{stats}")
+                self.after_upload()
+                return True
+            except UploadError as e:
+                logger.warning(f"继续上次的上传失败，{e}，重新申请上传")
+        data = PC_UPLOAD_REQUEST.render(
+            account=self.account,
+            size=source.size,
+            name=source.name,
+            digest=source.md5(),
+            modify_time=time.strftime('%Y%m%d%H%M%S'),
+            parent_id=self.settings['upload_dirid'] or '',
+        )
         headers = {
             'x-huawei-uploadSrc': '1',
             'x-huawei-channelSrc': '10200153',
@@ -135,7 +192,7 @@ class CaiYun:
             'Content-Type': 'text/xml;UTF-8',
             'Accept': '*/*'
         }
-        resp = requests.post(
+        resp = self.session.post(
             "https://ose.caiyun.feixin.10086.cn/richlifeApp/devapp/IUploadAndDownload",
             headers=headers,
             cookies=self.cookies,
@@ -145,11 +202,39 @@ class CaiYun:
         if resp.status_code != 200:
             logger.error(f"上传文件失败，返回结果{resp.content}")
             return False
-        logger.success("上传文件成功")
+        try:
+            ticket = UploadTicket.parse(resp.content)
+            if not ticket.ok:
+                logger.error(f"上传文件失败，resultCode={ticket.result_code}")
+                return False
+            if not ticket.need_upload:
+                logger.success("文件已存在，秒传成功")
+                return True
+            if not ticket.redirection_url:
+                # 与原来一样，没有上传地址时服务器不需要上传内容
+                logger.success("上传文件成功")
+                self.after_upload()
+                return True
+            stats = ChunkedUploader(self.session, source, ticket, key).upload()
+        except UploadError as e:
+            logger.error(f"上传文件失败，{e}")
+            return False
+        logger.success(f"上传文件成功，{stats}")
+        self.after_upload()
         return True
 
+    def after_upload(self):
+        """
+        上传会改变文件夹的更新时间，使分享用的文件索引失效；上传只新增文件，已索引的文件仍然有效，
+        所以在分享之后上传时，把索引更新到上传后的更新时间，下次运行仍可使用索引
+        """
+        folder_id = self.settings['upload_dirid']
+        seen = self.folder_versions.get(folder_id)
+        if seen:
+            file_index.touch(self.account, folder_id, seen, self.folder_version(folder_id))
+
     def check_pending_clouds(self):
-        r = requests.get('https://caiyun.feixin.10086.cn/market/signin/page/receive',
+        r = self.session.get('https://caiyun.feixin.10086.cn/market/signin/page/receive',
                          headers=self.headers,
                          cookies=self.cookies).json()
         clouds = r["result"].get("receive", "")
@@ -157,40 +242,9 @@ class CaiYun:
         logger.info(f'当前待领取云朵:{clouds}')
         logger.info(f'当前云朵数量:{all_clouds}')
 
-    def share_file(self):
-        if config.get('share.enable') == False:
-            logger.info('分享功能未开启，跳过')
-            return True
-        get_filelist_data = {
-            "catalogID": config.get('caiyun.upload_dirid'),
-            "sortDirection": 1,
-            "startNumber": 1,
-            "endNumber": 100,
-            "filterType": 0,
-            "catalogSortType": 0,
-            "contentSortType": 0,
-            "commonAccountInfo": {
-                "account": self.account,
-                "accountType": 1
-            }
-        }
-        url = 'https://yun.139.com/orchestration/personalCloud/catalog/v1.0/getDisk'
-        if config.get('caiyun.AccountType') == 1:
-            url = 'https://personal-kd-njs.yun.139.com/hcy/file/list'
-            get_filelist_data = {
-                "parentFileId": config.get('caiyun.upload_dirid'),
-                "pageInfo": {
-                    "pageSize": 40,
-                    "pageCursor": "0|[9-1-0,11-0-1][JzIwMjQtMDMtMDlUMTA6MzM6MTguNzEyWic=,J0ZzSVEweF9NVVVDVmNqQ1plaTJ0SFZxSjVadjNsbEZ5bCc=]"
-                },
-                "imageThumbnailStyleList": [
-                    "Big",
-                    "Small"
-                ],
-                "orderDirection": "DESC",
-                "orderBy": "updated_at"
-            }
-        headers = {
+    def _hcy_headers(self):
+        """新个人云（AccountType 1）接口的请求头"""
+        return {
             "x-yun-op-type": "1",
             "x-yun-net-type": "1",
             "x-yun-module-type": "100",
@@ -203,70 +257,134 @@ class CaiYun:
             "x-yun-tid": "cb8a2b4b-8eb7-4b05-b1c1-e41020",
             "content-type": "application/json"
         }
-        filelist_resp = requests.post(
-            url=url,
-            headers=self.headers if config.get('caiyun.AccountType') == 0 else headers,
-            cookies=self.cookies,
-            data=json.dumps(get_filelist_data)
-        )
-        filelist = filelist_resp.json()
-        share_file_data = {}
-        share_data = {}
-
-        if config.get('caiyun.AccountType') == 1:
-            contentList = filelist.get('data').get('items')
-            share_file_data = [item for item in contentList if config.get('share.filename') in item['name']][0]
-            share_data = {
-                "getOutLinkReq": {
-                    "subLinkType": 0,
-                    "encrypt": 1,
-                    "coIDLst": [share_file_data.get('fileId')],
-                    "caIDLst": [],
-                    "pubType": 1,
-                    "dedicatedName": share_file_data.get('name'),
-                    "periodUnit": 1,
-                    "viewerLst": [],
-                    "extInfo": {
-                        "isWatermark": 0,
-                        "shareChannel": "3001"
-                    },
-                    "period": 1,
-                    "commonAccountInfo": {
-                        "account": self.account,
-                        "accountType": 1
-                    }
-                }
-            }
 
-        if config.get('caiyun.AccountType') == 0:
-            contentList = filelist.get('data').get('getDiskResult').get('contentList')
-            if contentList == []:
-                logger.warning('没有文件可以分享')
-                return False
-            share_file_data = [item for item in contentList if config.get('share.filename') in item["contentName"]][0]
-            share_data = {
-                "getOutLinkReq": {
-                    "subLinkType": 0,
-                    "encrypt": 1,
-                    "coIDLst": [share_file_data.get('contentID')],
-                    "caIDLst": [],
-                    "pubType": 1,
-                    "dedicatedName": share_file_data.get('contentName'),
-                    "periodUnit": 1,
-                    "viewerLst": [],
-                    "extInfo": {
-                        "isWatermark": 0,
-                        "shareChannel": "3001"
-                    },
-                    "period": 1,
-                    "commonAccountInfo": {
-                        "account": self.account,
-                        "accountType": 1
-                    }
+    def folder_version(self, folder_id):
+        """
+        获取文件夹的更新时间，用于判断文件索引是否失效
+        :return: 更新时间字符串，获取失败时返回None
+        """
+        try:
+            if self.settings['AccountType'] == 1:
+                resp = self.session.post(
+                    url='https://personal-kd-njs.yun.139.com/hcy/file/get',
+                    headers=self._hcy_headers(),
+                    data=json.dumps({"fileId": folder_id})
+                ).json()
+                return (resp.get('data') or {}).get('updatedAt')
+            resp = self.session.post(
+                url='https://yun.139.com/orchestration/personalCloud/catalog/v1.0/getCatalogInfo',
+                headers=self.headers,
+                cookies=self.cookies,
+                data=json.dumps({
+                    "catalogID": folder_id,
+                    "commonAccountInfo": {"account": self.account, "accountType": 1}
+                })
+            ).json()
+            return ((resp.get('data') or {}).get('catalogInfo') or {}).get('updateTime')
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            logger.warning(f'获取文件夹更新时间失败: {e}')
+            return None
+
+    def list_files(self, folder_id, page_size=100):
+        """
+        逐页列出文件夹内容，调用方找到需要的文件后停止迭代即不再请求后续页面
+        :return: 迭代 (文件名, 文件id)
+        """
+        if self.settings['AccountType'] == 1:
+            cursor = ''
+            while True:
+                data = self.session.post(
+                    url='https://personal-kd-njs.yun.139.com/hcy/file/list',
+                    headers=self._hcy_headers(),
+                    data=json.dumps({
+                        "parentFileId": folder_id,
+                        "pageInfo": {"pageSize": page_size, "pageCursor": cursor},
+                        "orderDirection": "DESC",
+                        "orderBy": "updated_at"
+                    })
+                ).json().get('data') or {}
+                for item in data.get('items') or []:
+                    yield item['name'], item['fileId']
+                cursor = data.get('nextPageCursor')
+                if not cursor:
+                    return
+
+        start = 1
+        while True:
+            result = self.session.post(
+                url='https://yun.139.com/orchestration/personalCloud/catalog/v1.0/getDisk',
+                headers=self.headers,
+                cookies=self.cookies,
+                data=json.dumps({
+                    "catalogID": folder_id,
+                    "sortDirection": 1,
+                    "startNumber": start,
+                    "endNumber": start + page_size - 1,
+                    "filterType": 0,
+                    "catalogSortType": 0,
+                    "contentSortType": 0,
+                    "commonAccountInfo": {"account": self.account, "accountType": 1}
+                })
+            ).json().get('data', {}).get('getDiskResult') or {}
+            for item in result.get('contentList') or []:
+                yield item['contentName'], item['contentID']
+            # 序号范围同时包含子文件夹和文件
+            count = len(result.get('catalogList') or []) + len(result.get('contentList') or [])
+            start += page_size
+            if count < page_size or start > int(result.get('nodeCount') or 0):
+                return
+
+    def find_file(self, folder_id, keyword):
+        """
+        查找文件名包含keyword的文件，文件夹未变化时直接使用本地索引
+        :return: (文件名, 文件id)，没有找到时返回None
+        """
+        version = self.folder_versions[folder_id] = self.folder_version(folder_id)
+        found = file_index.lookup(self.account, folder_id, version, keyword)
+        if found:
+            logger.info(f'使用文件索引: {found[0]}')
+            return found
+        files = {}
+        for name, file_id in self.list_files(folder_id):
+            files[name] = file_id
+            if keyword in name:
+                found = name, file_id
+                break
+        file_index.update(self.account, folder_id, version, files)
+        return found
+
+    def share_file(self):
+        if self.settings['share.enable'] == False:
+            logger.info('分享功能未开启，跳过')
+            return True
+        found = self.find_file(self.settings['upload_dirid'], self.settings['share.filename'])
+        if found is None:
+            logger.warning('没有文件可以分享')
+            return False
+        name, file_id = found
+        share_data = {
+            "getOutLinkReq": {
+                "subLinkType": 0,
+                "encrypt": 1,
+                "coIDLst": [file_id],
+                "caIDLst": [],
+                "pubType": 1,
+                "dedicatedName": name,
+                "periodUnit": 1,
+                "viewerLst": [],
+                "extInfo": {
+                    "isWatermark": 0,
+                    "shareChannel": "3001"
+                },
+                "period": 1,
+                "commonAccountInfo": {
+                    "account": self.account,
+                    "accountType": 1
                 }
             }
+        }
 
-        resp_json = requests.post(
+        resp_json = self.session.post(
             url='https://yun.139.com/orchestration/personalCloud-rebuild/outlink/v1.0/getOutLink',
             headers=self.headers,
             cookies=self.cookies,
@@ -283,36 +401,150 @@ class CaiYun:
             return False
 
 
-def gen_file(size_mb=15):
-    file_size = size_mb * 1024 * 1024
-    return os.urandom(file_size)
+# 常驻运行时保留每个账号的CaiYun对象，下一次执行直接使用内存中的jwtToken和已建立的连接
+_clients = {}
+
+
+def get_client(settings):
+    client = _clients.get(settings['phone'])
+    if client is None or client.settings != settings:
+        client = CaiYun(token=str(settings['token']), account=settings['phone'], settings=settings)
+        _clients[settings['phone']] = client
+    return client
+
+
+def run_account(settings):
+    caiyun = get_client(settings)
+    steps = (
+        ('jwt', f"账号{caiyun.encrypt_account}：获取jwtToken", caiyun.fetch_jwtToken),
+        ('sign', "开始签到", caiyun.sign),
+        # 先分享再上传：上传会改变文件夹的更新时间，分享时文件索引仍然有效
+        ('share', "开始完成分享文件任务", caiyun.share_file),
+        ('upload', "开始上传大小为7M的文件", lambda: caiyun.upload(payload_cache.get(7 * 1024 * 1024))),
+        ('pending_clouds', "检查待领取云朵", caiyun.check_pending_clouds),
+    )
+    with logger.contextualize(account=caiyun.encrypt_account), metrics.labels(account=caiyun.encrypt_account):
+        for task, message, func in steps:
+            logger.info(message)
+            with metrics.labels(task=task):
+                func()
+        logger.success(f"账号{caiyun.encrypt_account}任务执行完成")
 
 
 def job():
-    caiyun = CaiYun(token=str(config.get('caiyun.token')), account=config.get('caiyun.phone'))  # type: ignore
-    logger.info("获取jwtToken")
-    caiyun.fetch_jwtToken()
-    logger.info("开始签到")
-    caiyun.sign()
-    logger.info("开始上传大小为7M的文件")
-    caiyun.upload(gen_file(7))
-    logger.info("开始完成分享文件任务")
-    caiyun.share_file()
-    logger.info("检查待领取云朵")
-    caiyun.check_pending_clouds()
-    logger.success("任务执行完成")
+    # 定时运行时配置文件可能被修改，未修改时不会重新读取
+    config.reload_if_changed()
+    accounts = config.accounts()
+    workers = min(WORKERS, len(accounts))
+    logger.info(f"共{len(accounts)}个账号，并发数{workers}")
+    # 所有账号共用一个进程和连接池，各账号的Session只保存自己的cookie
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='caiyun') as executor:
+        futures = {executor.submit(run_account, settings): settings for settings in accounts}
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                logger.opt(exception=future.exception()).error(f"账号{futures[future]['phone']}执行异常")
+    report_run()
+
+
+def report_run():
+    """
+    一次执行结束后输出连接复用、熔断和请求指标，设置了 YDYP_METRICS_FILE 时写入文件；
+    指标在进程内累计，守护模式下每次执行后都重新写入累计值，与Prometheus计数器的语义一致
+    """
+    http_pool.report(logger.info)
+    circuit_breaker.report(logger.info)
+    metrics.report(logger.info)
+
+
+def mask_phone(phone):
+    return phone[:3] + "*" * 4 + phone[7:]
+
+
+def new_scheduler():
+    return DailyScheduler(
+        times=config.get('daemon.times') or ['08:00', '20:00'],
+        window=config.get('daemon.window') * 60,
+        catch_up=config.get('daemon.catch_up') * 3600,
+        state_path=os.getenv('YDYP_SCHEDULE_STATE', SCHEDULE_STATE),
+    )
+
+
+def next_runs(scheduler):
+    """
+    各账号下一次执行的时间
+    :return: [(手机号, datetime)]，按时间排序
+    """
+    runs = [(settings['phone'], scheduler.next_run(settings['phone'])) for settings in config.accounts()]
+    return sorted(((phone, datetime.fromtimestamp(at)) for phone, at in runs if at), key=lambda run: run[1])
+
+
+def log_next_runs(scheduler):
+    for phone, at in next_runs(scheduler):
+        logger.info(f"账号{mask_phone(phone)} 下次执行时间 {at:%Y-%m-%d %H:%M:%S}")
+
+
+def daemon():
+    """
+    常驻运行：配置和连接池只初始化一次，各账号按 daemon.times 定时执行，
+    在 daemon.window 分钟内错开，启动时补上停止期间错过的执行（daemon.catch_up 小时内）
+    """
+    scheduler = new_scheduler()
+    running = set()
+    lock = threading.Lock()
+    logger.success(f"常驻运行，执行时间 {', '.join(f'{h:02d}:{m:02d}' for h, m in scheduler.times)}，"
+                   f"账号错开{scheduler.window // 60}分钟内执行")
+    log_next_runs(scheduler)
+
+    def finished(phone, slot, future):
+        if future.exception() is not None:
+            logger.opt(exception=future.exception()).error(f"账号{phone}执行异常")
+        # 失败也记为已执行，不在同一时间点反复重试
+        scheduler.mark_done(phone, slot)
+        with lock:
+            running.discard(phone)
+            idle = not running
+        # 同一批（错开执行的）账号都结束后输出报告并写入指标文件
+        if idle:
+            report_run()
+        at = scheduler.next_run(phone)
+        if at:
+            logger.info(f"账号{mask_phone(phone)} 下次执行时间 {datetime.fromtimestamp(at):%Y-%m-%d %H:%M:%S}")
+
+    with ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='caiyun') as executor:
+        while True:
+            if config.reload_if_changed():
+                scheduler = new_scheduler()
+                log_next_runs(scheduler)
+            for settings in config.accounts():
+                phone = settings['phone']
+                with lock:
+                    if phone in running:
+                        continue
+                    slot = scheduler.due_slot(phone)
+                    if slot is None:
+                        continue
+                    running.add(phone)
+                future = executor.submit(run_account, settings)
+                future.add_done_callback(partial(finished, phone, slot))
+            # 睡到最近的一次执行，最长1分钟（期间配置文件可能被修改）
+            upcoming = [at for at in (scheduler.next_run(s['phone']) for s in config.accounts()) if at]
+            time.sleep(min([60.0] + [max(1.0, at - time.time()) for at in upcoming]))
 
 
 def main():
-    '''
-    schedule.every().day.at("08:00").do(job)
-    schedule.every().day.at("20:00").do(job)
-    logger.success("定时任务已创建，将在8:00和20:00执行一次")
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
-    '''
-    job()
+    parser = argparse.ArgumentParser(description='移动云盘签到')
+    parser.add_argument('--daemon', action='store_true', help='常驻运行，按配置的时间定时执行')
+    parser.add_argument('--next-runs', action='store_true', help='显示各账号下次执行时间后退出')
+    parser.add_argument('--profile-startup', action='store_true', help='显示各模块的导入耗时后退出')
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup('main', printer=logger.info)
+    elif args.next_runs:
+        log_next_runs(new_scheduler())
+    elif args.daemon:
+        daemon()
+    else:
+        job()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,210 @@
+# -*- coding=UTF-8 -*-
+# 请求指标：按 接口/账号/任务 统计每次请求的耗时分布（p50/p95/p99）、状态码、重试次数、发送和接收字节数，
+# 运行结束时输出汇总，并可写入JSON或Prometheus textfile（node_exporter textfile collector）
+# 请求在 http_pool 的共享适配器/transport中记录，账号和任务标签通过 labels() 设置（contextvars，线程池和asyncio任务中各自独立）
+# 环境变量：YDYP_METRICS_FILE  运行结束时写入的文件，.json结尾为JSON，否则为Prometheus文本格式
+import bisect
+import contextvars
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# 耗时分桶上限（秒），按分桶估算分位数，内存占用与请求数无关
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.35, 0.5, 0.75, 1.0, 1.5, 2.5, 4.0, 6.0, 10.0, 20.0,
+           30.0, 60.0)
+
+_account = contextvars.ContextVar('metrics_account', default='')
+_task = contextvars.ContextVar('metrics_task', default='')
+_lock = threading.Lock()
+_series = {}  # (接口, 账号, 任务) -> Series
+
+
+@contextmanager
+def labels(account=None, task=None):
+    """在此上下文中发出的请求带上账号/任务标签"""
+    tokens = []
+    if account is not None:
+        tokens.append((_account, _account.set(str(account))))
+    if task is not None:
+        tokens.append((_task, _task.set(str(task))))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def endpoint(method, url):
+    """接口名：方法 + 域名 + 路径，不含查询参数"""
+    parts = urlsplit(str(url))
+    return f'{method.upper()} {parts.hostname}{parts.path}'
+
+
+class Series:
+    __slots__ = ('counts', 'total', 'count', 'statuses', 'errors', 'retries', 'bytes_out', 'bytes_in')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 最后一个为超过最大分桶的请求
+        self.total = 0.0
+        self.count = 0
+        self.statuses = {}
+        self.errors = 0  # 网络异常（没有状态码）
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def quantile(self, q):
+        """按分桶线性插值估算分位数（秒）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else BUCKETS[-1] * 2
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+    def to_dict(self):
+        return {
+            'count': self.count, 'errors': self.errors, 'retries': self.retries,
+            'bytes_out': self.bytes_out, 'bytes_in': self.bytes_in,
+            'p50': round(self.quantile(0.5), 4), 'p95': round(self.quantile(0.95), 4),
+            'p99': round(self.quantile(0.99), 4), 'mean': round(self.total / self.count, 4) if self.count else 0.0,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+        }
+
+
+def _get_series(name):
+    key = (name, _account.get(), _task.get())
+    series = _series.get(key)
+    if series is None:
+        series = _series.setdefault(key, Series())
+    return series
+
+
+def record(method, url, elapsed, status=None, bytes_out=0, bytes_in=0):
+    """
+    记录一次请求（每次重试单独记录）
+    :param status: 状态码，网络异常时为None
+    """
+    with _lock:
+        series = _get_series(endpoint(method, url))
+        series.counts[bisect.bisect_left(BUCKETS, elapsed)] += 1
+        series.total += elapsed
+        series.count += 1
+        if status is None:
+            series.errors += 1
+        else:
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+        series.bytes_out += bytes_out or 0
+        series.bytes_in += bytes_in or 0
+
+
+def record_retry(method, url):
+    with _lock:
+        _get_series(endpoint(method, url)).retries += 1
+
+
+def snapshot():
+    """
+    :return: [{'endpoint', 'account', 'task', ...统计}]
+    """
+    with _lock:
+        return [dict(endpoint=name, account=account, task=task, **series.to_dict())
+                for (name, account, task), series in sorted(_series.items())]
+
+
+def _by_endpoint():
+    """按接口合并各账号/任务的统计"""
+    merged = {}
+    with _lock:
+        for (name, _, _), series in _series.items():
+            total = merged.setdefault(name, Series())
+            total.counts = [a + b for a, b in zip(total.counts, series.counts)]
+            total.total += series.total
+            total.count += series.count
+            total.errors += series.errors
+            total.retries += series.retries
+            total.bytes_out += series.bytes_out
+            total.bytes_in += series.bytes_in
+            for status, count in series.statuses.items():
+                total.statuses[status] = total.statuses.get(status, 0) + count
+    return merged
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text():
+    lines = [
+        '# HELP ydyp_request_duration_seconds Request latency per attempt.',
+        '# TYPE ydyp_request_duration_seconds histogram',
+    ]
+    counters = {
+        'ydyp_requests_total': [], 'ydyp_request_errors_total': [], 'ydyp_request_retries_total': [],
+        'ydyp_request_bytes_sent_total': [], 'ydyp_response_bytes_received_total': [],
+    }
+    with _lock:
+        items = sorted(_series.items())
+        for (name, account, task), series in items:
+            base = f'endpoint="{_escape_label(name)}",account="{_escape_label(account)}",task="{_escape_label(task)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), series.counts):
+                cumulative += count
+                lines.append(f'ydyp_request_duration_seconds_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'ydyp_request_duration_seconds_sum{{{base}}} {series.total:.6f}')
+            lines.append(f'ydyp_request_duration_seconds_count{{{base}}} {series.count}')
+            for status, count in sorted(series.statuses.items()):
+                counters['ydyp_requests_total'].append(f'ydyp_requests_total{{{base},status="{status}"}} {count}')
+            counters['ydyp_request_errors_total'].append(f'ydyp_request_errors_total{{{base}}} {series.errors}')
+            counters['ydyp_request_retries_total'].append(f'ydyp_request_retries_total{{{base}}} {series.retries}')
+            counters['ydyp_request_bytes_sent_total'].append(
+                f'ydyp_request_bytes_sent_total{{{base}}} {series.bytes_out}')
+            counters['ydyp_response_bytes_received_total'].append(
+                f'ydyp_response_bytes_received_total{{{base}}} {series.bytes_in}')
+    for name, samples in counters.items():
+        lines.append(f'# TYPE {name} counter')
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+def dump(path):
+    """写入指标文件（原子替换，textfile collector不会读到写了一半的文件）"""
+    if path.endswith('.json'):
+        content = json.dumps(snapshot(), ensure_ascii=False, indent=1)
+    else:
+        content = prometheus_text()
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.metrics.', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def report(printer=print, top=10, path=None):
+    """
+    打印最慢的接口，设置了 YDYP_METRICS_FILE（或传入path）时同时写入文件
+    """
+    merged = _by_endpoint()
+    if merged:
+        printer('\n📊 接口耗时统计（p50/p95/p99，秒）')
+        for name, series in sorted(merged.items(), key=lambda item: -item[1].quantile(0.95))[:top]:
+            failed = series.errors + sum(count for status, count in series.statuses.items() if status >= 400)
+            printer(f'-{name}: {series.count}次 {series.quantile(0.5):.3f}/{series.quantile(0.95):.3f}/'
+                    f'{series.quantile(0.99):.3f}，失败{failed}次，重试{series.retries}次')
+    path = path or os.getenv('YDYP_METRICS_FILE')
+    if path:
+        dump(path)
+        printer(f'指标已写入 {path}')
@@ -0,0 +1,172 @@
+# -*- coding=UTF-8 -*-
+# 本地模拟服务器：模拟移动云盘各接口的响应，用于并发/性能测试，不会访问真实服务
+# 用法：python mock_server.py --port 8765 --delay 50
+#      然后设置环境变量 YDYP_MOCK_URL=http://127.0.0.1:8765 再运行脚本，所有请求都会被转发到本地
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+MOCK_ENV = 'YDYP_MOCK_URL'
+
+# 路径后缀 -> 响应数据，按顺序匹配
+ROUTES = [
+    ('querySpecToken', {"success": True, "data": {"token": "mock-sso-token"}}),
+    ('tyrzLogin.action', {"code": 0, "result": {"token": "mock-jwt-token"}}),
+    ('signin/page/info', {"msg": "success", "result": {"todaySignIn": True}}),
+    ('signin/page/infoV2', {"msg": "success", "result": {"todaySignIn": True}}),
+    ('getByMarketRuleName', {"msg": "success", "result": {}}),
+    ('signin/task/click', {"code": 0, "msg": "success", "result": "mock"}),
+    ('signin/task/taskList', {"msg": "success", "result": {}}),
+    ('followSignInfo', {"msg": "success", "result": {"todaySignIn": True}}),
+    ('shakeIt', {"code": 0, "result": {"shakePrizeconfig": None}}),
+    ('drawInfo', {"msg": "success", "result": {"surplusNumber": 0}}),
+    ('backupgift/info', {"code": 0, "result": {"state": 1}}),
+    ('taskExpansion', {"code": 0, "result": {}}),
+    ('msgPushOn/task/status', {"code": 0, "result": {"pushOn": 0}}),
+    ('signin/page/receive', {"code": 0, "result": {"receive": 0, "total": 100}}),
+    ('getUserPrizeLogPage', {"code": 0, "result": {"result": []}}),
+    ('exchangeList', {"msg": "success", "result": {}}),
+    ('hcy/file/get', {"success": True, "data": {"updatedAt": "2024-01-01T00:00:00.000+08:00"}}),
+    ('getCatalogInfo', {"success": True, "data": {"catalogInfo": {"updateTime": "20240101000000"}}}),
+    ('getOutLink', {"success": True, "data": {"getOutLinkRes": {"getOutLinkResSet": [{"linkUrl": "mock-link"}]}}}),
+    ('/send', {"code": 200, "msg": "请求成功", "data": "mock-push"}),  # pushplus
+]
+
+
+# IUploadAndDownload 的返回，{url} 为分片上传地址
+UPLOAD_TICKET = ('<?xml version="1.0" encoding="UTF-8"?><result resultCode="0"><pcUploadFileResult>'
+                 '<redirectionUrl>{url}</redirectionUrl><newContentIDList length="1"><newContent>'
+                 '<contentID>mock-content-id</contentID><contentName>{name}</contentName>'
+                 '<isNeedUpload>1</isNeedUpload><fileEtag>0</fileEtag></newContent></newContentIDList>'
+                 '<catalogIDList length="0"/><isSlice>1</isSlice><uploadTaskID>{task_id}</uploadTaskID>'
+                 '</pcUploadFileResult></result>')
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持keep-alive
+    disable_nagle_algorithm = True
+    delay = 0.0  # 每个请求的模拟延迟（秒）
+    upload_fail_rate = 0.0  # 分片上传随机失败（返回503）的比例
+    request_count = 0
+    uploads = {}  # uploadTaskID -> {起始位置: 分片内容}
+    notifications = []  # 收到的推送请求体（pushplus /send）
+    folder_size = 250  # 文件列表接口返回的文件数，文件名为 file_0.txt ... ，用于测试分页
+    _count_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload, content_type='application/json;charset=UTF-8', status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _upload_ticket(self, body):
+        def text(tag):
+            return body.split(f'<{tag}>'.encode(), 1)[-1].split(f'</{tag}>'.encode(), 1)[0].decode('utf-8', 'replace')
+
+        # 同一文件返回同一个任务id，便于断点续传
+        task_id = f'mock-task-{text("digest")[:16]}'
+        url = f'http://127.0.0.1:{self.server.server_address[1]}/uploadFile'
+        name = text('contentName')
+        self._send(UPLOAD_TICKET.format(url=url, task_id=task_id, name=name).encode('utf-8'),
+                   'text/xml;charset=UTF-8')
+
+    def _upload_part(self, body):
+        if random.random() < self.upload_fail_rate:
+            return self._send(b'busy', 'text/plain', status=503)
+        start = int(self.headers.get('range', 'bytes=0-0')[6:].split('-')[0])
+        with MockHandler._count_lock:
+            MockHandler.uploads.setdefault(self.headers.get('uploadtaskID'), {})[start] = body
+        self._send(b'<result resultCode="0"/>', 'text/xml;charset=UTF-8')
+
+    def _file_list(self, path, body):
+        request = json.loads(body or b'{}')
+        names = [f'file_{i}.txt' for i in range(self.folder_size)]
+        if path.endswith('hcy/file/list'):
+            page = request.get('pageInfo', {})
+            start = int(page.get('pageCursor') or 0)
+            end = start + int(page.get('pageSize') or 100)
+            items = [{"name": name, "fileId": f'id-{name}'} for name in names[start:end]]
+            cursor = str(end) if end < len(names) else ''
+            return {"success": True, "data": {"items": items, "nextPageCursor": cursor}}
+        start = int(request.get('startNumber') or 1) - 1
+        end = int(request.get('endNumber') or 100)
+        contents = [{"contentName": name, "contentID": f'id-{name}'} for name in names[start:end]]
+        return {"success": True, "data": {"getDiskResult": {"nodeCount": len(names), "catalogList": [],
+                                                             "contentList": contents}}}
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        with MockHandler._count_lock:
+            MockHandler.request_count += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+        path = urlsplit(self.path).path
+        if path.endswith('IUploadAndDownload'):
+            return self._upload_ticket(body)
+        if path.endswith('uploadFile'):
+            return self._upload_part(body)
+        if path.endswith('/send'):
+            with MockHandler._count_lock:
+                MockHandler.notifications.append(json.loads(body or b'{}'))
+        if path.endswith(('hcy/file/list', 'getDisk')):
+            return self._send(json.dumps(self._file_list(path, body)).encode('utf-8'))
+        body = next((data for suffix, data in ROUTES if path.endswith(suffix)), {"code": 0, "msg": "success"})
+        self._send(json.dumps(body).encode('utf-8'))
+
+    do_GET = _reply
+    do_POST = _reply
+
+
+def start_server(port=0, delay=0.0, upload_fail_rate=0.0):
+    """
+    在后台线程启动模拟服务器
+    :param port: 端口，0为随机端口
+    :param delay: 每个请求的延迟（秒）
+    :param upload_fail_rate: 分片上传随机失败的比例，用于测试重试和断点续传
+    :return: (server, base_url)
+    """
+    handler = type('Handler', (MockHandler,), {'delay': delay, 'upload_fail_rate': upload_fail_rate})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def mock_url():
+    return os.getenv(MOCK_ENV) or None
+
+
+def redirect(url, base=None):
+    """把真实接口地址改写到模拟服务器，保留路径和查询参数"""
+    base = base or mock_url()
+    if not base:
+        return url
+    target = urlsplit(base)
+    parts = urlsplit(url)
+    return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='移动云盘本地模拟服务器')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0, help='每个请求的延迟，毫秒')
+    parser.add_argument('--upload-fail-rate', type=float, default=0, help='分片上传随机失败的比例')
+    args = parser.parse_args()
+    server, url = start_server(args.port, args.delay / 1000, args.upload_fail_rate)
+    print(f'模拟服务器已启动: {url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
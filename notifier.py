@@ -0,0 +1,130 @@
+# -*- coding=UTF-8 -*-
+# 通知推送：一次运行中产生的消息先收集起来，结束时每个渠道只合并发送一条，
+# 在后台线程中发送（POST请求体，不把内容放在URL里），失败按RetryPolicy重试
+# 渠道（backend）可替换，测试时可指向本地模拟服务器（mock_server.py 的 /send）
+# 环境变量：
+#   PUSHPLUS             pushplus的token，设置后通过pushplus推送
+#   YDYP_NOTIFY_SCRIPT   设为1时同时调用脚本目录下青龙面板的 notify.py 中的send
+import os
+import threading
+import time
+
+import http_pool
+from retry_policy import default_policy
+
+
+class NotifyError(Exception):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class PushPlusBackend:
+    """pushplus微信推送：需要1元实名认证费用"""
+    name = 'pushplus'
+    URL = 'http://www.pushplus.plus/send'
+
+    def __init__(self, token, url=URL):
+        self.token = token
+        self.url = url
+
+    def send(self, title, content):
+        response = http_pool.request('POST', self.url, json={'token': self.token, 'title': title,
+                                                              'content': content, 'template': 'txt'}, timeout=30)
+        if response.status_code >= 400:
+            raise NotifyError(f'状态码{response.status_code}', response.status_code,
+                              response.headers.get('Retry-After'))
+        data = response.json()
+        if data.get('code') != 200:
+            # 业务错误（如token无效）重试也不会成功
+            raise NotifyError(data.get('msg') or str(data), status=400)
+        return data.get('msg')
+
+
+class NotifyScriptBackend:
+    """青龙面板的 notify.py，第一次发送时才导入"""
+    name = 'notify.py'
+
+    def send(self, title, content):
+        try:
+            from notify import send
+        except ImportError as e:
+            raise NotifyError(f'加载通知服务失败: {e}', status=400) from None
+        send(title, content)
+
+
+def default_backends():
+    backends = []
+    if os.getenv('PUSHPLUS'):
+        backends.append(PushPlusBackend(os.getenv('PUSHPLUS')))
+    if os.getenv('YDYP_NOTIFY_SCRIPT') == '1':
+        backends.append(NotifyScriptBackend())
+    return backends
+
+
+class Notifier:
+    def __init__(self, backends=None, retry_policy=default_policy, printer=print):
+        """
+        :param backends: 推送渠道，有 name 属性和 send(title, content) 方法，默认由环境变量决定
+        """
+        self.backends = default_backends() if backends is None else backends
+        self.retry_policy = retry_policy
+        self.printer = printer
+        self.messages = []  # (标题, 内容)
+        self.results = {}  # 渠道名 -> 结果或异常
+        self._thread = None
+
+    def add(self, title, content):
+        if content:
+            self.messages.append((title, content))
+
+    def payload(self):
+        """合并后的 (标题, 内容)，没有消息时返回None"""
+        if not self.messages:
+            return None
+        titles = list(dict.fromkeys(title for title, _ in self.messages))
+        content = '\n'.join(content.strip('\n') for _, content in self.messages)
+        return ' / '.join(titles), content
+
+    def _send_with_retry(self, backend, title, content):
+        budget = self.retry_policy.new_budget()
+        attempt = 0
+        while True:
+            try:
+                return backend.send(title, content)
+            except (NotifyError, OSError, ValueError) as e:
+                delay = self.retry_policy.next_delay(attempt, budget, getattr(e, 'status', None),
+                                                     getattr(e, 'retry_after', None))
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    def _dispatch(self, title, content):
+        for backend in self.backends:
+            try:
+                result = self._send_with_retry(backend, title, content)
+                self.printer(f'{backend.name}推送结果：{result}')
+            except Exception as e:
+                result = e
+                self.printer(f'{backend.name}推送失败：{e}')
+            self.results[backend.name] = result
+
+    def flush(self):
+        """
+        在后台线程中发送已收集的消息，立即返回
+        :return: 后台线程，没有需要发送的内容时返回None
+        """
+        payload = self.payload()
+        if payload is None or not self.backends:
+            return None
+        self.messages = []
+        self._thread = threading.Thread(target=self._dispatch, args=payload, name='notifier', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout=60):
+        """等待后台发送完成，进程退出前调用"""
+        if self._thread is not None:
+            self._thread.join(timeout)
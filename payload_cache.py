@@ -0,0 +1,74 @@
+# -*- coding=UTF-8 -*-
+# 上传任务的文件缓存：每种大小只生成一次固定内容的文件，连同MD5一起保存在磁盘上
+# 之后的运行和其他账号直接复用（mmap读取），不再重新生成随机数据，也不再重新计算MD5
+# 环境变量：YDYP_PAYLOAD_DIR  缓存目录，默认脚本目录下的 .payload_cache
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from upload_source import UploadSource
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.payload_cache')
+
+_lock = threading.Lock()
+_memo = {}  # 本进程内已确认可用的 (目录, 大小) -> md5
+
+
+class PayloadCache:
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+
+    def _paths(self, size):
+        path = os.path.join(self.directory, f'payload_{size}.bin')
+        return path, path + '.json'
+
+    def _load_md5(self, size):
+        path, meta_path = self._paths(size)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # 文件被截断或替换时重新生成
+        if meta.get('size') != size or not os.path.exists(path) or os.path.getsize(path) != size:
+            return None
+        return meta.get('md5')
+
+    def _generate(self, size):
+        os.makedirs(self.directory, exist_ok=True)
+        path, meta_path = self._paths(size)
+        digest = hashlib.md5()
+        fd, tmp_path = tempfile.mkstemp(prefix='.payload.', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                # 以大小作为种子，同样大小的文件内容固定
+                for chunk in UploadSource.random(size, seed=size).chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        md5 = digest.hexdigest().upper()
+        fd, tmp_meta = tempfile.mkstemp(prefix='.payload.', dir=self.directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'size': size, 'md5': md5}, f)
+        os.replace(tmp_meta, meta_path)
+        return md5
+
+    def get(self, size, name='7'):
+        """
+        获取指定大小的上传文件
+        :return: UploadSource，已带有MD5
+        """
+        key = (self.directory, size)
+        with _lock:
+            md5 = _memo.get(key) or self._load_md5(size) or self._generate(size)
+            _memo[key] = md5
+        path, _ = self._paths(size)
+        return UploadSource.from_mmap(path, name=name, md5=md5)
+
+
+payload_cache = PayloadCache(os.getenv('YDYP_PAYLOAD_DIR') or DEFAULT_DIR)
@@ -0,0 +1,104 @@
+# -*- coding=UTF-8 -*-
+# 令牌桶限速：代替脚本里写死的随机等待
+# 每个域名一个桶，所有账号共享（控制打到服务器的总速率）；每个账号另有一个桶（保持单账号的请求节奏）
+# 环境变量：
+#   YDYP_HOST_RATE     每个域名每秒请求数，默认20
+#   YDYP_RATE_LIMITS   单独指定域名速率，如 caiyun.feixin.10086.cn=10,happy.mail.10086.cn=5
+#   YDYP_ACCOUNT_RATE  每个账号每秒请求数，默认1.5，与原来每个请求前等待1-1.5秒的节奏相当
+#   YDYP_BURST_RATE    戳一戳、摇一摇这类批量请求每个账号每秒请求数，默认5
+#   YDYP_BURST_CONCURRENCY  批量请求的并发数，默认5
+import os
+import threading
+import time
+
+import tracing
+
+HOST_RATE = float(os.getenv('YDYP_HOST_RATE') or 20)
+ACCOUNT_RATE = float(os.getenv('YDYP_ACCOUNT_RATE') or 1.5)
+BURST_RATE = float(os.getenv('YDYP_BURST_RATE') or 5)
+BURST_CONCURRENCY = max(1, int(os.getenv('YDYP_BURST_CONCURRENCY') or 5))
+
+
+def parse_rate_limits(value):
+    limits = {}
+    for item in (value or '').split(','):
+        host, _, rate = item.partition('=')
+        if host.strip() and rate.strip():
+            limits[host.strip()] = float(rate)
+    return limits
+
+
+HOST_RATES = parse_rate_limits(os.getenv('YDYP_RATE_LIMITS'))
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """
+        :param rate: 每秒生成的令牌数，<=0 表示不限速
+        :param capacity: 桶容量，即允许的突发请求数，默认与rate相同（至少1）
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self.waited = 0.0  # 累计等待时间
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        预定令牌，令牌不足时允许透支，返回需要等待的秒数
+        先到先得，等待的线程/协程不需要循环争抢
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        wait = self.reserve(tokens)
+        if wait:
+            tracing.sleep(wait, 'rate_limit')
+
+    async def acquire_async(self, tokens=1):
+        wait = self.reserve(tokens)
+        if wait:
+            await tracing.async_sleep(wait, 'rate_limit')
+
+
+_buckets = {}
+_lock = threading.Lock()
+
+
+def limiter_for(host):
+    """获取域名对应的令牌桶，同一进程内所有账号共享"""
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(HOST_RATES.get(host.split(':')[0], HOST_RATE))
+        return bucket
+
+
+def account_limiter():
+    """每个账号一个令牌桶，容量为1，请求之间保持均匀间隔"""
+    return TokenBucket(ACCOUNT_RATE, capacity=1)
+
+
+def burst_limiter():
+    """每个账号的批量请求令牌桶，容量等于并发数，允许一批请求同时发出"""
+    return TokenBucket(BURST_RATE, capacity=BURST_CONCURRENCY)
+
+
+def report(printer=print):
+    busy = [(host, bucket) for host, bucket in _buckets.items() if bucket.waited >= 0.01]
+    if not busy:
+        return
+    printer('\n⏱️ 限速等待统计')
+    for host, bucket in sorted(busy):
+        printer(f'-{host}: 限速{bucket.rate:g}次/秒，累计等待{bucket.waited:.1f}秒')
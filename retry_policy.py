@@ -0,0 +1,95 @@
+# -*- coding=UTF-8 -*-
+# 请求重试策略：指数退避 + 完全随机抖动（full jitter），支持Retry-After，每个账号有重试预算
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# 可重试的状态码，其他4xx重试也不会成功
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value):
+    """
+    解析Retry-After响应头
+    :param value: 秒数或HTTP日期
+    :return: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class RetryBudget:
+    """单个账号在一次运行中可用的重试次数，多个线程/协程共用"""
+
+    def __init__(self, total):
+        self.remaining = total
+        self._lock = threading.Lock()
+
+    def consume(self):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=5, base_delay=0.5, max_delay=8.0, max_retry_after=30.0, budget=20,
+                 retryable_status=RETRYABLE_STATUS):
+        """
+        :param max_attempts: 单个请求最多尝试次数（含第一次）
+        :param base_delay: 退避基数（秒），第n次重试的等待上限为 base_delay * 2**n
+        :param max_delay: 单次退避的等待上限（秒）
+        :param max_retry_after: Retry-After超过此值时不再重试
+        :param budget: 每个账号的重试总次数
+        :param retryable_status: 可重试的HTTP状态码
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self.retryable_status = retryable_status
+
+    def new_budget(self):
+        return RetryBudget(self.budget)
+
+    def is_retryable(self, status=None):
+        """status为None表示网络异常（连接失败、超时等），可以重试"""
+        return status is None or status in self.retryable_status
+
+    def delay(self, attempt, retry_after=None):
+        """
+        计算第attempt次（从0开始）失败后的等待时间
+        :return: 等待秒数，None表示不应再重试
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def next_delay(self, attempt, budget, status=None, retry_after=None):
+        """
+        判断是否重试并返回等待时间，会消耗重试预算
+        :return: 等待秒数，None表示放弃
+        """
+        if attempt + 1 >= self.max_attempts or not self.is_retryable(status):
+            return None
+        delay = self.delay(attempt, parse_retry_after(retry_after))
+        if delay is None or not budget.consume():
+            return None
+        return delay
+
+
+default_policy = RetryPolicy(
+    max_attempts=int(os.getenv('YDYP_RETRY_ATTEMPTS') or 5),
+    budget=int(os.getenv('YDYP_RETRY_BUDGET') or 20),
+)
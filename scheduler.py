@@ -0,0 +1,107 @@
+# -*- coding=UTF-8 -*-
+# 常驻进程的每日定时：每个账号在每个执行时间点之后的一段时间窗口内错开执行，
+# 偏移量由账号决定（重启后不变），记录每个账号最近一次完成的时间点，
+# 进程停止期间错过的执行在启动后补上（每个账号只补最近一次）
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_STATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.schedule_state.json')
+
+
+def parse_times(times):
+    """['08:00', '20:30'] -> [(8, 0), (20, 30)]"""
+    result = []
+    for value in times:
+        hour, minute = str(value).split(':')
+        result.append((int(hour), int(minute)))
+    return sorted(result)
+
+
+class DailyScheduler:
+    def __init__(self, times, window=1800, catch_up=12 * 3600, state_path=DEFAULT_STATE, clock=time.time):
+        """
+        :param times: 每天的执行时间，如 ['08:00', '20:00']（本地时间）
+        :param window: 各账号在执行时间之后错开的时间窗口（秒）
+        :param catch_up: 最多补执行多久以前错过的执行（秒），0为不补
+        :param state_path: 记录各账号最近一次完成时间点的文件，为空时不保存
+        """
+        self.times = parse_times(times)
+        self.window = max(0, int(window))
+        self.catch_up = catch_up
+        self.state_path = state_path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.last_slots = self._load()
+
+    def _load(self):
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self.state_path:
+            return
+        directory = os.path.dirname(self.state_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(prefix='.schedule_state.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.last_slots, f)
+            os.replace(tmp_path, self.state_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def offset(self, key):
+        """账号在时间窗口内的固定偏移（秒）"""
+        if not self.window:
+            return 0
+        digest = hashlib.md5(str(key).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') % self.window
+
+    def _slots(self, key, start_day, days):
+        """从start_day开始days天内该账号的所有执行时间（时间戳，升序）"""
+        offset = self.offset(key)
+        for day in range(days):
+            date = start_day + datetime.timedelta(days=day)
+            for hour, minute in self.times:
+                at = datetime.datetime.combine(date, datetime.time(hour, minute))
+                yield at.timestamp() + offset
+
+    def due_slot(self, key):
+        """
+        该账号当前应执行的时间点：已到时间、尚未完成、且没有超过补执行时限的最近一个
+        :return: 时间戳，没有需要执行的返回None
+        """
+        now = self.clock()
+        today = datetime.date.fromtimestamp(now)
+        passed = [slot for slot in self._slots(key, today - datetime.timedelta(days=2), 3) if slot <= now]
+        if not passed:
+            return None
+        slot = passed[-1]
+        if slot <= self.last_slots.get(str(key), 0):
+            return None
+        if now - slot > max(self.catch_up, 60):
+            return None
+        return slot
+
+    def next_run(self, key):
+        """该账号下一次执行的时间戳（不含当前待执行的）"""
+        now = self.clock()
+        today = datetime.date.fromtimestamp(now)
+        return next((slot for slot in self._slots(key, today, 2) if slot > now), None)
+
+    def mark_done(self, key, slot):
+        with self._lock:
+            if slot > self.last_slots.get(str(key), 0):
+                self.last_slots[str(key)] = slot
+                self._save()
@@ -0,0 +1,125 @@
+# -*- coding=UTF-8 -*-
+# 简单的任务依赖图调度：每个任务声明依赖，依赖都完成后才执行，互不依赖的任务并发执行
+# 执行后记录每个任务的耗时，并给出关键路径（决定总耗时的那条依赖链）
+# 任务在提交时所在上下文（contextvars）的副本中执行，账号标签、日志分区等会带到线程池里
+# 并发执行时每个任务的输出先缓存，按添加任务的顺序输出，与逐个执行时的输出相同
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+import tracing
+from fn_print import capture, emit
+
+
+class Task:
+    __slots__ = ('name', 'func', 'deps', 'title', 'started', 'finished', 'error', 'output')
+
+    def __init__(self, name, func, deps=(), title=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.title = title  # 开始执行时打印的标题
+        self.started = self.finished = None
+        self.error = None
+        self.output = None  # 并发执行时缓存的输出
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class TaskGraph:
+    def __init__(self, max_workers=4, printer=print):
+        self.max_workers = max_workers
+        self.printer = printer
+        self.tasks = {}
+        self.started = self.finished = None
+
+    def add(self, name, func, deps=(), title=None):
+        """
+        添加任务
+        :param name: 任务名，需唯一
+        :param func: 无参数的可调用对象
+        :param deps: 依赖的任务名，必须已经添加
+        :param title: 开始执行时打印的标题
+        """
+        if name in self.tasks:
+            raise ValueError(f'任务重复: {name}')
+        missing = [dep for dep in deps if dep not in self.tasks]
+        if missing:
+            raise ValueError(f'任务{name}的依赖不存在: {missing}')
+        self.tasks[name] = Task(name, func, deps, title)
+        return self
+
+    def _run_task(self, task):
+        if task.title:
+            self.printer(task.title)
+        task.started = time.perf_counter()
+        try:
+            with metrics.labels(task=task.name), tracing.span(task.name):
+                task.func()
+        except Exception as e:
+            # 任务失败不影响依赖它的任务，例如领取云朵仍然要执行
+            task.error = e
+            self.printer(f'任务{task.name}执行异常: {e}')
+        finally:
+            task.finished = time.perf_counter()
+
+    def _run_captured(self, task):
+        with capture() as task.output:
+            self._run_task(task)
+
+    def run(self):
+        """按依赖关系执行所有任务，阻塞直到全部完成"""
+        self.started = time.perf_counter()
+        if self.max_workers <= 1:
+            # 依赖必须先添加，按添加顺序执行即满足依赖关系
+            for task in self.tasks.values():
+                self._run_task(task)
+            self.finished = time.perf_counter()
+            return self
+
+        pending = dict(self.tasks)
+        done = set()
+        running = {}
+        unprinted = list(self.tasks.values())  # 还没有输出的任务，按添加顺序
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='task') as executor:
+            while pending or running:
+                for name in [name for name, task in pending.items() if done.issuperset(task.deps)]:
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, self._run_captured, pending.pop(name))] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done.add(running.pop(future))
+                # 前面的任务都已输出后才输出后面任务的缓存
+                while unprinted and unprinted[0].name in done:
+                    task = unprinted.pop(0)
+                    emit(task.output)
+                    task.output = None
+        self.finished = time.perf_counter()
+        return self
+
+    def critical_path(self):
+        """从最后完成的任务开始，沿着最晚完成的依赖往回找，得到实际的关键路径"""
+        finished = [task for task in self.tasks.values() if task.finished is not None]
+        if not finished:
+            return []
+        task = max(finished, key=lambda t: t.finished)
+        path = [task]
+        while task.deps:
+            task = max((self.tasks[dep] for dep in task.deps), key=lambda t: t.finished or 0)
+            path.append(task)
+        return path[::-1]
+
+    def report(self):
+        if self.finished is None:
+            return
+        self.printer(f'\n⏱️ 任务总耗时{self.finished - self.started:.1f}s')
+        for task in sorted(self.tasks.values(), key=lambda t: t.started or 0):
+            self.printer(f'-{task.name}: {task.duration:.1f}s{" (异常)" if task.error else ""}')
+        path = self.critical_path()
+        self.printer(f'-关键路径: {" → ".join(task.name for task in path)} '
+                     f'({path[-1].finished - self.started:.1f}s)')
@@ -0,0 +1,87 @@
+# -*- coding=UTF-8 -*-
+# jwtToken本地缓存：按账号保存在json文件中，未过期时跨运行复用，省去 querySpecToken + tyrzLogin 两次请求
+# 环境变量：
+#   YDYP_TOKEN_CACHE  缓存文件路径，默认脚本目录下的 .token_cache.json，设为空字符串关闭缓存
+#   YDYP_JWT_TTL      jwtToken无法解析过期时间时的有效期（秒），默认3600
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.token_cache.json')
+DEFAULT_TTL = int(os.getenv('YDYP_JWT_TTL') or 3600)
+EXPIRY_MARGIN = 60  # 提前多少秒视为过期，避免用到即将过期的token
+
+
+def jwt_expiry(token):
+    """token是标准JWT时返回其exp，否则返回None"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp else None
+    except (IndexError, ValueError, AttributeError, TypeError):
+        return None
+
+
+class TokenCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, data):
+        # 先写临时文件再原子替换，中途中断不会留下损坏的缓存
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(prefix='.token_cache.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, account, kind='jwt'):
+        """返回未过期的token，没有时返回None"""
+        if not self.path:
+            return None
+        with self._lock:
+            entry = self._load().get(account, {}).get(kind)
+        if entry and entry.get('expires_at', 0) - EXPIRY_MARGIN > time.time():
+            return entry.get('token')
+        return None
+
+    def set(self, account, token, kind='jwt', ttl=None):
+        if not self.path:
+            return
+        expires_at = jwt_expiry(token) or time.time() + (ttl or self.ttl)
+        with self._lock:
+            # 写入前重新读取，保留其他账号（可能由其他进程写入）的缓存
+            data = self._load()
+            data.setdefault(account, {})[kind] = {'token': token, 'expires_at': expires_at}
+            self._save(data)
+
+    def invalidate(self, account, kind='jwt'):
+        if not self.path:
+            return
+        with self._lock:
+            data = self._load()
+            if data.get(account, {}).pop(kind, None) is not None:
+                self._save(data)
+
+
+token_cache = TokenCache(os.getenv('YDYP_TOKEN_CACHE', DEFAULT_PATH))
@@ -0,0 +1,207 @@
+# -*- coding=UTF-8 -*-
+# 任务耗时追踪：每个任务、每次请求（net）、等待（sleep：限速、重试退避、任务中的固定等待）、
+# 解析响应（parse：response.json()）记录为一个span，运行结束时按任务汇总各类耗时，
+# 并可导出为Chrome trace-event JSON（chrome://tracing 或 https://ui.perfetto.dev 打开，按账号+线程分行显示）
+# 未启用时span()返回同一个空上下文，启用时每个span只记录一个元组，常驻开启的开销很小（见 benchmarks/bench_tracing.py）
+# 环境变量：
+#   YDYP_TRACE         设为1时启用，只输出汇总
+#   YDYP_TRACE_FILE    启用并在运行结束时写入trace文件
+#   YDYP_TRACE_EVENTS  最多记录的span数，超出后丢弃，默认200000
+import contextvars
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+TASK, NET, SLEEP, PARSE = 'task', 'net', 'sleep', 'parse'
+CO_COROUTINE = 0x80  # inspect.CO_COROUTINE，避免导入inspect
+
+# 当前账号（trace中的一行）和最内层的任务，汇总时net/sleep/parse计入该任务
+_track = contextvars.ContextVar('trace_track', default='')
+_task = contextvars.ContextVar('trace_task', default='')
+_NULL = nullcontext()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'start', 'token')
+
+    def __init__(self, tracer, name, cat):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.token = None
+
+    def __enter__(self):
+        if self.cat == TASK:
+            self.token = _task.set(self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        if self.token is not None:
+            _task.reset(self.token)
+        # 任务span记录的是外层任务，汇总时从外层任务的耗时中扣除
+        self.tracer.add(self.name, self.cat, _task.get(), self.start, end)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled=False, max_events=200000, path=None):
+        """
+        :param path: 运行结束时写入的trace文件，为空时只输出汇总
+        """
+        self.enabled = enabled
+        self.max_events = max_events
+        self.path = path
+        # (名称, 类别, 所属任务, 账号, 线程id, 开始ns, 结束ns)；list.append是原子操作，无需加锁
+        self.events = []
+        self.dropped = 0
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name, cat=TASK):
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name, cat)
+
+    def add(self, name, cat, task, start, end):
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        ident = threading.get_ident()
+        if ident not in self.thread_names:
+            self.thread_names[ident] = threading.current_thread().name
+        self.events.append((name, cat, task, _track.get(), ident, start, end))
+
+    def clear(self):
+        self.events = []
+        self.dropped = 0
+        self.origin = time.perf_counter_ns()
+
+    def summary(self):
+        """
+        按任务汇总
+        :return: {任务名: {'count', 'task', 'net', 'sleep', 'parse', 'nested'}}，单位秒，nested为嵌套的子任务耗时；
+                 并发请求（戳一戳、摇一摇）的net为累计值，可能大于任务耗时
+        """
+        result = {}
+
+        def item(task):
+            return result.setdefault(task, {'count': 0, TASK: 0.0, NET: 0.0, SLEEP: 0.0, PARSE: 0.0, 'nested': 0.0})
+
+        for name, cat, task, _, _, start, end in list(self.events):
+            elapsed = (end - start) / 1e9
+            if cat == TASK:
+                item(name)['count'] += 1
+                item(name)[TASK] += elapsed
+                if task:
+                    item(task)['nested'] += elapsed
+            elif task:
+                item(task)[cat] += elapsed
+        return result
+
+    def chrome_trace(self):
+        """Chrome trace-event格式：每个 账号+线程 一行，span为完整事件（ph=X），时间单位微秒"""
+        tids = {}
+        trace_events = []
+        for name, cat, task, track, ident, start, end in list(self.events):
+            key = (track, ident)
+            tid = tids.get(key)
+            if tid is None:
+                tid = tids[key] = len(tids) + 1
+                label = f'{track} {self.thread_names.get(ident, ident)}' if track else self.thread_names.get(ident)
+                trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                                     'args': {'name': label}})
+            event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': 1, 'tid': tid,
+                     'ts': (start - self.origin) / 1000, 'dur': (end - start) / 1000}
+            if task:
+                event['args'] = {'task': task}
+            trace_events.append(event)
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms',
+                'otherData': {'dropped': self.dropped}}
+
+    def export(self, path):
+        """写入trace文件（原子替换）"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.trace.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.chrome_trace(), f, ensure_ascii=False, separators=(',', ':'))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def report(self, printer=print, top=15):
+        """输出各任务的耗时构成，设置了trace文件时同时导出"""
+        if not self.enabled or not self.events:
+            return
+        summary = self.summary()
+        printer('\n🧭 任务耗时构成（秒，总计/网络/等待/解析/其他）')
+        for task, item in sorted(summary.items(), key=lambda entry: -entry[1][TASK])[:top]:
+            other = max(0.0, item[TASK] - item['nested'] - item[NET] - item[SLEEP] - item[PARSE])
+            count = f' ({item["count"]}次)' if item['count'] > 1 else ''
+            printer(f'-{task}: {item[TASK]:.2f}/{item[NET]:.2f}/{item[SLEEP]:.2f}/{item[PARSE]:.3f}/{other:.3f}{count}')
+        if self.dropped:
+            printer(f'-超出上限丢弃{self.dropped}个span')
+        if self.path:
+            self.export(self.path)
+            printer(f'trace已写入 {self.path}，可在 https://ui.perfetto.dev 打开')
+
+
+_path = os.getenv('YDYP_TRACE_FILE') or None
+tracer = Tracer(enabled=bool(_path) or os.getenv('YDYP_TRACE') == '1',
+                max_events=int(os.getenv('YDYP_TRACE_EVENTS') or 200000), path=_path)
+
+
+def span(name, cat=TASK):
+    return tracer.span(name, cat)
+
+
+@contextmanager
+def track(name):
+    """此上下文中的span显示在name这一行（通常为脱敏后的账号）"""
+    token = _track.set(str(name))
+    try:
+        yield
+    finally:
+        _track.reset(token)
+
+
+def traced(func):
+    """把方法的每次调用记录为一个任务span，支持普通函数和async函数"""
+    name = func.__name__
+    if func.__code__.co_flags & CO_COROUTINE:
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tracer.span(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def sleep(seconds, name='sleep'):
+    with tracer.span(name, SLEEP):
+        time.sleep(seconds)
+
+
+async def async_sleep(seconds, name='sleep'):
+    import asyncio  # 只有139cloud22.py用到，139cloud.py 和 main.py 不需要导入asyncio
+    with tracer.span(name, SLEEP):
+        await asyncio.sleep(seconds)
+
+
+def report(printer=print):
+    tracer.report(printer)
@@ -0,0 +1,131 @@
+# -*- coding=UTF-8 -*-
+# 上传文件来源：按块读取，边读边计算MD5，内存占用只有一个块的大小，与文件大小无关
+import hashlib
+import mmap
+import os
+import random
+import threading
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class UploadSource:
+    def __init__(self, chunk_factory, size, name='7', md5=None, path=None, buffer_factory=None):
+        """
+        :param chunk_factory: 无参数函数，每次调用返回一个新的数据块迭代器（可重复读取，用于计算摘要和上传）
+        :param size: 总字节数
+        :param name: 上传时使用的文件名
+        :param md5: 已知的MD5（大写十六进制），传入后不再计算
+        :param path: 来源是磁盘文件时的路径，上传时可直接传文件对象
+        :param buffer_factory: 无参数函数，返回整个内容的只读memoryview（如mmap），分片时直接切片，不复制内容
+        """
+        self.chunk_factory = chunk_factory
+        self.size = size
+        self.name = name
+        self.path = path
+        self.buffer_factory = buffer_factory
+        self._md5 = md5
+
+    def chunks(self):
+        return self.chunk_factory()
+
+    def __iter__(self):
+        return self.chunks()
+
+    def read_range(self, offset, length):
+        """
+        读取[offset, offset+length)的内容，用于分片上传
+        :return: bytes，有buffer_factory时为映射的memoryview切片
+        """
+        if self.buffer_factory is not None:
+            return self.buffer_factory()[offset:offset + length]
+        if self.path is not None:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                return f.read(length)
+        parts = []
+        position = 0
+        end = offset + length
+        for chunk in self.chunks():
+            chunk_end = position + len(chunk)
+            if chunk_end > offset:
+                parts.append(bytes(chunk[max(0, offset - position):end - position]))
+            if chunk_end >= end:
+                break
+            position = chunk_end
+        return b''.join(parts)
+
+    def md5(self):
+        """大写十六进制MD5，按块增量计算，结果缓存"""
+        if self._md5 is None:
+            digest = hashlib.md5()
+            for chunk in self.chunks():
+                digest.update(chunk)
+            self._md5 = digest.hexdigest().upper()
+        return self._md5
+
+    @classmethod
+    def from_bytes(cls, data, name='7'):
+        view = memoryview(data)
+        return cls(lambda: (view[i:i + CHUNK_SIZE] for i in range(0, len(view), CHUNK_SIZE)), len(data), name)
+
+    @classmethod
+    def from_path(cls, path, name=None, chunk_size=CHUNK_SIZE):
+        def read_chunks():
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+        return cls(read_chunks, os.path.getsize(path), name or os.path.basename(path), path=path)
+
+    @classmethod
+    def from_mmap(cls, path, name=None, chunk_size=CHUNK_SIZE, md5=None):
+        """
+        通过mmap读取文件，由系统按需换入页面，不经过Python的文件缓冲区；
+        映射在第一次读取时建立并一直保留，计算摘要和分片上传都直接切片映射，不复制内容
+        """
+        mapping = []
+        lock = threading.Lock()
+
+        def mapped():
+            # 分片上传时多个线程同时读取，只建立一次映射
+            with lock:
+                if not mapping:
+                    if os.path.getsize(path) == 0:
+                        mapping.append(memoryview(b''))
+                    else:
+                        with open(path, 'rb') as f:
+                            mapping.append(memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)))
+                return mapping[0]
+
+        def map_chunks():
+            view = mapped()
+            for i in range(0, len(view), chunk_size):
+                yield view[i:i + chunk_size]
+
+        return cls(map_chunks, os.path.getsize(path), name or os.path.basename(path), md5=md5, path=path,
+                   buffer_factory=mapped)
+
+    @classmethod
+    def from_generator(cls, generator_factory, size, name='7'):
+        return cls(generator_factory, size, name)
+
+    @classmethod
+    def random(cls, size, name='7', seed=None, chunk_size=CHUNK_SIZE):
+        """
+        生成随机内容：只生成一个随机块，后续块在其基础上写入块序号，
+        每块内容不同但无需为每个字节调用os.urandom
+        """
+        seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'big')
+        block = random.Random(seed).randbytes(chunk_size)
+
+        def random_chunks():
+            buffer = bytearray(block)
+            for index, offset in enumerate(range(0, size, chunk_size)):
+                buffer[:8] = index.to_bytes(8, 'big')
+                yield bytes(buffer[:min(chunk_size, size - offset)])
+
+        return cls(random_chunks, size, name)
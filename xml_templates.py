@@ -0,0 +1,131 @@
+# -*- coding=UTF-8 -*-
+# XML请求模板：模板在导入时解析并序列化一次，拆成固定片段和占位符，
+# 每次请求只需把转义后的值拼进去，输出紧凑的UTF-8字节（无缩进空白）
+# 响应用XMLPullParser增量解析，拿到需要的字段后即停止
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+_MARK = '\x00'  # 占位符在序列化结果中的标记，不会出现在合法XML中
+
+
+def _escape(value):
+    text = str(value)
+    # 手机号、大小、MD5等绝大多数值不含特殊字符，跳过转义
+    if '&' in text or '<' in text or '>' in text:
+        return escape(text)
+    return text
+
+
+class XmlTemplate:
+    def __init__(self, skeleton):
+        """
+        :param skeleton: XML骨架，元素文本为 {字段名} 的位置是占位符，缩进和换行会被去掉
+        """
+        root = ET.fromstring(skeleton)
+        self.fields = []
+        for element in root.iter():
+            text = (element.text or '').strip()
+            if text.startswith('{') and text.endswith('}'):
+                self.fields.append(text[1:-1])
+                element.text = _MARK
+            else:
+                element.text = text or None
+            element.tail = None
+        parts = ET.tostring(root, encoding='unicode').split(_MARK)
+        # 固定片段中的%转义后，整个模板变成一次%格式化即可完成拼接
+        self._pattern = '%s'.join(part.replace('%', '%%') for part in parts)
+
+    def render(self, **values):
+        """填入字段值（自动转义），返回bytes"""
+        return (self._pattern % tuple([_escape(values[field]) for field in self.fields])).encode('utf-8')
+
+
+def parse_fields(chunks, tags, attrs=()):
+    """
+    增量解析XML，返回各标签第一次出现时的文本，找齐后不再继续解析
+    :param chunks: bytes，或bytes迭代器（如 response.iter_content()）
+    :param tags: 需要的标签名
+    :param attrs: 需要的根元素属性名
+    :return: dict，未找到的标签不在结果中
+    """
+    if isinstance(chunks, (bytes, bytearray, str)):
+        chunks = (chunks,)
+    wanted = set(tags)
+    result = {}
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root_seen = False
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start' and not root_seen:
+                root_seen = True
+                result.update({name: element.get(name) for name in attrs if element.get(name) is not None})
+            elif event == 'end' and element.tag in wanted and element.tag not in result:
+                result[element.tag] = (element.text or '').strip()
+        if root_seen and wanted.issubset(result):
+            break
+    return result
+
+
+# 移动云盘APP（139cloud.py / 139cloud22.py）上传任务请求
+APP_UPLOAD_REQUEST = XmlTemplate('''
+<pcUploadFileRequest>
+    <ownerMSISDN>{phone}</ownerMSISDN>
+    <fileCount>1</fileCount>
+    <totalSize>1</totalSize>
+    <uploadContentList length="1">
+        <uploadContentInfo>
+            <comlexFlag>0</comlexFlag>
+            <contentDesc></contentDesc>
+            <contentName>000000.txt</contentName>
+            <contentSize>1</contentSize>
+            <contentTAGList></contentTAGList>
+            <digest>C4CA4238A0B923820DCC509A6F75849B</digest>
+            <exif/>
+            <fileEtag>0</fileEtag>
+            <fileVersion>0</fileVersion>
+            <updateContentID></updateContentID>
+        </uploadContentInfo>
+    </uploadContentList>
+    <newCatalogName></newCatalogName>
+    <parentCatalogID></parentCatalogID>
+    <operation>0</operation>
+    <path></path>
+    <manualRename>2</manualRename>
+    <autoCreatePath length="0"/>
+    <tagID></tagID>
+    <tagType></tagType>
+</pcUploadFileRequest>
+''')
+
+# PC客户端（main.py）上传请求
+PC_UPLOAD_REQUEST = XmlTemplate('''
+<pcUploadFileRequest>
+    <ownerMSISDN>{account}</ownerMSISDN>
+    <fileCount>1</fileCount>
+    <totalSize>{size}</totalSize>
+    <uploadContentList length="1">
+        <uploadContentInfo>
+            <contentName>{name}</contentName>
+            <contentSize>{size}</contentSize>
+            <contentDesc></contentDesc>
+            <contentTAGList></contentTAGList>
+            <comlexFlag>0</comlexFlag>
+            <comlexCID></comlexCID>
+            <resCID length="0"></resCID>
+            <digest>{digest}</digest>
+            <extInfo length="1">
+                <entry>
+                    <key>modifyTime</key>
+                    <vaule>{modify_time}</vaule>
+                </entry>
+            </extInfo>
+        </uploadContentInfo>
+    </uploadContentList>
+    <newCatalogName></newCatalogName>
+    <parentCatalogID>{parent_id}</parentCatalogID>
+    <operation>0</operation>
+    <path></path>
+    <manualRename>2</manualRename>
+</pcUploadFileRequest>
+''')